@@ -17,13 +17,22 @@ class Config:
     WHISPER_API_KEY: str = os.getenv("WHISPER_API_KEY", OPENAI_API_KEY)  # Use OpenAI key for Whisper
     GPT4_API_KEY: str = os.getenv("GPT4_API_KEY", OPENAI_API_KEY)  # Use OpenAI key for GPT-4
     
+    # Local whisper.cpp (optional) — ikisi de setliyse transkripsiyon
+    # API yerine lokal, int8-quantized GGML modeliyle yapılır
+    WHISPER_CPP_BIN: str = os.getenv("WHISPER_CPP_BIN", "")
+    WHISPER_CPP_MODEL: str = os.getenv("WHISPER_CPP_MODEL", "")
+
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    
+
+    # Cached header dicts (API keys are immutable after process start)
+    _cached_runway_headers: Optional[dict] = None
+    _cached_openai_headers: Optional[dict] = None
+
     @classmethod
     def validate(cls) -> None:
         """Validate required configuration"""
@@ -44,25 +53,31 @@ class Config:
     
     @classmethod
     def get_runway_headers(cls) -> dict:
-        """Get Runway ML API headers"""
-        if not cls.RUNWAY_ML_API_KEY or cls.RUNWAY_ML_API_KEY == "your_runway_ml_api_key_here":
-            raise ValueError("RUNWAY_ML_API_KEY is not properly configured")
-        
-        return {
-            "Authorization": f"Bearer {cls.RUNWAY_ML_API_KEY}",
-            "Content-Type": "application/json"
-        }
-    
+        """Get Runway ML API headers (validated and built once, then cached)"""
+        if cls._cached_runway_headers is None:
+            if not cls.RUNWAY_ML_API_KEY or cls.RUNWAY_ML_API_KEY == "your_runway_ml_api_key_here":
+                raise ValueError("RUNWAY_ML_API_KEY is not properly configured")
+
+            cls._cached_runway_headers = {
+                "Authorization": f"Bearer {cls.RUNWAY_ML_API_KEY}",
+                "Content-Type": "application/json"
+            }
+
+        return cls._cached_runway_headers
+
     @classmethod
     def get_openai_headers(cls) -> dict:
-        """Get OpenAI API headers"""
-        if not cls.OPENAI_API_KEY or cls.OPENAI_API_KEY == "your_openai_api_key_here":
-            raise ValueError("OPENAI_API_KEY is not properly configured")
-        
-        return {
-            "Authorization": f"Bearer {cls.OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        """Get OpenAI API headers (validated and built once, then cached)"""
+        if cls._cached_openai_headers is None:
+            if not cls.OPENAI_API_KEY or cls.OPENAI_API_KEY == "your_openai_api_key_here":
+                raise ValueError("OPENAI_API_KEY is not properly configured")
+
+            cls._cached_openai_headers = {
+                "Authorization": f"Bearer {cls.OPENAI_API_KEY}",
+                "Content-Type": "application/json"
+            }
+
+        return cls._cached_openai_headers
     
     @classmethod
     def print_config(cls) -> None:
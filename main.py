@@ -1,100 +1,144 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, Dict
-import httpx
-import asyncio
-import os
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
+import hashlib
+import functools
+import time
 from dotenv import load_dotenv
-import uuid
-import json
 from datetime import datetime
 from config import Config
-from models import VideoRequest, VideoResponse, PipelineStatusResponse, PipelineConfig
+from models import VideoRequest, VideoResponse, PipelineStatusResponse
 from pipeline_manager import pipeline_manager
 from middleware.logging_middleware import LoggingMiddleware
 from middleware.error_middleware import ErrorHandlingMiddleware
-from utils.validators import validate_uuid, validate_video_url, validate_prompt, validate_pipeline_config
+from utils.validators import validate_uuid, validate_video_url, validate_prompt
+from utils.http_client import get_http_client, close_http_client
 from utils.logger import logger
 from exceptions import ValidationException, PipelineException
 
 # Load environment variables
 load_dotenv()
 
-# Validate configuration and print current config
-Config.validate()
-Config.print_config()
+# Field sets for serialized pipeline/step views
+_PIPELINE_SUMMARY_FIELDS = {
+    "pipelineId", "videoId", "status", "totalSteps", "completedSteps",
+    "createdAt", "updatedAt", "completedAt"
+}
+_STEP_FIELDS = {
+    "stepId", "stepType", "status", "order", "progress",
+    "startedAt", "completedAt", "error", "output"
+}
+
+def handle_unexpected(endpoint_name: str):
+    """Decorator: log last-resort exceptions once and convert them to a 500"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except (HTTPException, ValidationException, PipelineException):
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error in {endpoint_name}: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        return wrapper
+    return decorator
+
+def _pipeline_etag(pipeline) -> str:
+    """ETag derived from the pipeline's last update time"""
+    ts = pipeline.updatedAt or pipeline.createdAt
+    return hashlib.md5(f"{pipeline.pipelineId}:{ts.isoformat()}".encode()).hexdigest()
 
 app = FastAPI(
     title="Plaicube Video Pipeline API",
     description="Multi-step video processing pipeline with Runway ML, FFmpeg, WhisperAI, and GPT-4",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add middleware
 app.add_middleware(ErrorHandlingMiddleware)
 app.add_middleware(LoggingMiddleware)
 
-# CORS middleware
+# CORS middleware — explicit method/header lists let Starlette prebuild the
+# preflight headers instead of reflecting them per request
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
+@app.on_event("startup")
+async def startup_event():
+    # Validate configuration and print current config once the server starts,
+    # instead of paying for it at module import
+    Config.validate()
+    Config.print_config()
+
+    # Shared outbound HTTP client: one keep-alive connection pool for all
+    # Runway/OpenAI calls instead of a TLS handshake per request
+    app.state.http = get_http_client()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from services.gpt4_service import gpt4_service
+    await gpt4_service.aclose()
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {"message": "Plaicube Video Pipeline API - Multi-step processing"}
 
+# Health timestamp cached at 1-second granularity; high-QPS probes reuse
+# the same datetime object instead of allocating one per request
+_health_timestamp = (0, None)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    global _health_timestamp
+    now = int(time.time())
+    if _health_timestamp[0] != now:
+        _health_timestamp = (now, datetime.now())
+    return {"status": "healthy", "timestamp": _health_timestamp[1]}
 
 @app.post("/api/video/transform", response_model=VideoResponse)
+@handle_unexpected("transform_video")
 async def transform_video(request: VideoRequest, background_tasks: BackgroundTasks):
     """
     Video transformation pipeline başlat
     """
     try:
-        # Validate input
+        # Validate input (pipelineConfig is already parsed and validated by
+        # Pydantic as part of the request model)
         validate_uuid(request.videoId, "videoId")
         validate_video_url(str(request.videoUrl))
         validate_prompt(request.prompt)
-        
-        if request.pipelineConfig:
-            validate_pipeline_config(request.pipelineConfig)
-        
-        # Check if pipeline already exists for this video
-        existing_pipelines = [p for p in pipeline_manager.get_all_pipelines() 
-                            if p.videoId == request.videoId]
-        if existing_pipelines:
-            existing_pipeline = existing_pipelines[0]
-            logger.info(f"Pipeline already exists", pipeline_id=existing_pipeline.pipelineId, video_id=request.videoId)
-            return VideoResponse(
-                videoId=request.videoId,
-                pipelineId=existing_pipeline.pipelineId,
-                status=existing_pipeline.status,
-                message=f"Pipeline already exists with status: {existing_pipeline.status}",
-                totalSteps=existing_pipeline.totalSteps,
-                completedSteps=existing_pipeline.completedSteps,
-                createdAt=existing_pipeline.createdAt,
-                updatedAt=existing_pipeline.updatedAt
-            )
-        
-        # Parse pipeline configuration
-        config = None
-        if request.pipelineConfig:
-            config = PipelineConfig(**request.pipelineConfig)
-        
-        # Create new pipeline
-        pipeline = pipeline_manager.create_pipeline(
+
+        # Create new pipeline (returns the existing one if this video
+        # already has a pipeline — check-then-create is atomic in the manager)
+        pipeline, created = pipeline_manager.create_pipeline(
             video_id=request.videoId,
             video_url=str(request.videoUrl),
             prompt=request.prompt,
-            config=config
+            config=request.pipelineConfig
         )
-        
+
+        if not created:
+            logger.info(f"Pipeline already exists", pipeline_id=pipeline.pipelineId, video_id=request.videoId)
+            return VideoResponse(
+                videoId=request.videoId,
+                pipelineId=pipeline.pipelineId,
+                status=pipeline.status,
+                message=f"Pipeline already exists with status: {pipeline.status}",
+                totalSteps=pipeline.totalSteps,
+                completedSteps=pipeline.completedSteps,
+                createdAt=pipeline.createdAt,
+                updatedAt=pipeline.updatedAt
+            )
+
         logger.pipeline_start(pipeline.pipelineId, request.videoId)
         
         # Start pipeline in background
@@ -114,24 +158,29 @@ async def transform_video(request: VideoRequest, background_tasks: BackgroundTas
         raise HTTPException(status_code=400, detail=str(e))
     except PipelineException as e:
         raise HTTPException(status_code=500, detail=str(e))
-    except Exception as e:
-        logger.error(f"Unexpected error in transform_video: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/api/pipeline/{pipeline_id}/status", response_model=PipelineStatusResponse)
-async def get_pipeline_status(pipeline_id: str):
+@handle_unexpected("get_pipeline_status")
+async def get_pipeline_status(pipeline_id: str, request: Request, response: Response):
     """
     Pipeline durumunu kontrol et
     """
     try:
         # Validate pipelineId format
         validate_uuid(pipeline_id, "pipelineId")
-        
+
         # Get pipeline
         pipeline = pipeline_manager.get_pipeline(pipeline_id)
         if not pipeline:
             raise HTTPException(status_code=404, detail="Pipeline not found")
-        
+
+        # Let pollers short-circuit identical refetches
+        etag = _pipeline_etag(pipeline)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["Cache-Control"] = "private, max-age=1"
+        response.headers["ETag"] = etag
+
         return PipelineStatusResponse(
             pipelineId=pipeline.pipelineId,
             videoId=pipeline.videoId,
@@ -147,43 +196,39 @@ async def get_pipeline_status(pipeline_id: str):
         
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error in get_pipeline_status: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _iter_pipelines_json(pipelines, total, limit, offset):
+    """Pipeline listesini chunk chunk JSON olarak üret — tüm response
+    string'i hiçbir anda bellekte tutulmaz"""
+    yield b'{"pipelines":['
+    first = True
+    for p in pipelines:
+        if not first:
+            yield b","
+        first = False
+        yield orjson.dumps(p.model_dump(mode="json", include=_PIPELINE_SUMMARY_FIELDS))
+    yield b'],"total":%d,"limit":%d,"offset":%d}' % (total, limit, offset)
 
 @app.get("/api/pipelines")
-async def get_all_pipelines():
+@handle_unexpected("get_all_pipelines")
+async def get_all_pipelines(limit: int = 100, offset: int = 0):
     """
-    Tüm pipeline'ları listele
+    Pipeline'ları listele (limit/offset sayfalama; response boyutu geçmiş
+    pipeline sayısından bağımsız sınırlı kalır)
     """
-    try:
-        pipelines = pipeline_manager.get_all_pipelines()
-        logger.info(f"Retrieved all pipelines", count=len(pipelines))
-        
-        return {
-            "pipelines": [
-                {
-                    "pipelineId": p.pipelineId,
-                    "videoId": p.videoId,
-                    "status": p.status,
-                    "totalSteps": p.totalSteps,
-                    "completedSteps": p.completedSteps,
-                    "createdAt": p.createdAt,
-                    "updatedAt": p.updatedAt,
-                    "completedAt": p.completedAt
-                }
-                for p in pipelines
-            ],
-            "total": len(pipelines)
-        }
-        
-    except Exception as e:
-        logger.error(f"Unexpected error in get_all_pipelines: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    limit = max(0, min(limit, 1000))
+    offset = max(0, offset)
+    pipelines = pipeline_manager.get_all_pipelines(limit=limit, offset=offset)
+    logger.info(f"Retrieved pipelines", count=len(pipelines), offset=offset)
+
+    return StreamingResponse(
+        _iter_pipelines_json(pipelines, pipeline_manager.pipeline_count(), limit, offset),
+        media_type="application/json",
+        headers={"Cache-Control": "private, max-age=1"}
+    )
 
 @app.post("/api/pipeline/{pipeline_id}/cancel")
+@handle_unexpected("cancel_pipeline")
 async def cancel_pipeline(pipeline_id: str):
     """
     Pipeline'ı iptal et
@@ -202,13 +247,9 @@ async def cancel_pipeline(pipeline_id: str):
         
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error in cancel_pipeline: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.delete("/api/pipeline/{pipeline_id}")
+@handle_unexpected("delete_pipeline")
 async def delete_pipeline(pipeline_id: str):
     """
     Pipeline'ı sil
@@ -227,54 +268,42 @@ async def delete_pipeline(pipeline_id: str):
         
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error in delete_pipeline: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/api/pipeline/{pipeline_id}/steps")
-async def get_pipeline_steps(pipeline_id: str):
+@handle_unexpected("get_pipeline_steps")
+async def get_pipeline_steps(pipeline_id: str, request: Request, response: Response):
     """
     Pipeline adımlarını getir
     """
     try:
         # Validate pipelineId format
         validate_uuid(pipeline_id, "pipelineId")
-        
+
         # Get pipeline
         pipeline = pipeline_manager.get_pipeline(pipeline_id)
         if not pipeline:
             raise HTTPException(status_code=404, detail="Pipeline not found")
-        
+
+        etag = _pipeline_etag(pipeline)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["Cache-Control"] = "private, max-age=1"
+        response.headers["ETag"] = etag
+
         return {
             "pipelineId": pipeline.pipelineId,
             "steps": [
-                {
-                    "stepId": step.stepId,
-                    "stepType": step.stepType,
-                    "status": step.status,
-                    "order": step.order,
-                    "progress": step.progress,
-                    "startedAt": step.startedAt,
-                    "completedAt": step.completedAt,
-                    "error": step.error,
-                    "output": step.output
-                }
+                step.model_dump(mode="json", include=_STEP_FIELDS)
                 for step in pipeline.steps
             ]
         }
         
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error in get_pipeline_steps: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Legacy endpoints for backward compatibility
 @app.get("/api/video/{video_id}/status")
+@handle_unexpected("get_video_status_legacy")
 async def get_video_status_legacy(video_id: str):
     """
     Legacy video status endpoint (redirects to pipeline)
@@ -284,14 +313,11 @@ async def get_video_status_legacy(video_id: str):
         validate_uuid(video_id, "videoId")
         
         # Find pipeline for this video
-        pipelines = [p for p in pipeline_manager.get_all_pipelines() 
-                    if p.videoId == video_id]
-        
-        if not pipelines:
+        pipeline = pipeline_manager.get_by_video_id(video_id)
+
+        if not pipeline:
             raise HTTPException(status_code=404, detail="Video not found")
         
-        pipeline = pipelines[0]
-        
         return {
             "videoId": pipeline.videoId,
             "pipelineId": pipeline.pipelineId,
@@ -305,11 +331,6 @@ async def get_video_status_legacy(video_id: str):
         
     except ValidationException as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error in get_video_status_legacy: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
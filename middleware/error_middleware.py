@@ -1,68 +1,56 @@
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from exceptions import PlaicubeException, ValidationException, PipelineException, ServiceException
-from utils.logger import logger
-
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """Middleware for handling exceptions"""
-    
-    async def dispatch(self, request: Request, call_next):
-        try:
-            response = await call_next(request)
-            return response
-            
-        except ValidationException as e:
-            logger.error(f"Validation error: {str(e)}")
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": "Validation Error",
-                    "message": str(e),
-                    "type": "validation_error"
-                }
-            )
-            
-        except PipelineException as e:
-            logger.error(f"Pipeline error: {str(e)}")
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": "Pipeline Error",
-                    "message": str(e),
-                    "type": "pipeline_error"
-                }
-            )
-            
-        except ServiceException as e:
-            logger.error(f"Service error: {str(e)}")
-            return JSONResponse(
-                status_code=503,
-                content={
-                    "error": "Service Error",
-                    "message": str(e),
-                    "type": "service_error"
-                }
-            )
-            
-        except PlaicubeException as e:
-            logger.error(f"Plaicube error: {str(e)}")
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": "Internal Error",
-                    "message": str(e),
-                    "type": "internal_error"
-                }
-            )
-            
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": "Internal Server Error",
-                    "message": "An unexpected error occurred",
-                    "type": "unexpected_error"
-                }
-            ) 
\ No newline at end of file
+from fastapi.responses import JSONResponse
+from exceptions import PlaicubeException, ValidationException, PipelineException, ServiceException
+from utils.logger import logger
+
+# status code, error title and type tag per exception class, computed once
+_ERROR_MAP = {
+    ValidationException: (400, "Validation Error", "validation_error"),
+    PipelineException: (500, "Pipeline Error", "pipeline_error"),
+    ServiceException: (503, "Service Error", "service_error"),
+    PlaicubeException: (500, "Internal Error", "internal_error"),
+}
+
+class ErrorHandlingMiddleware:
+    """Pure ASGI middleware for handling exceptions.
+
+    Implemented directly against the ASGI interface instead of
+    BaseHTTPMiddleware to avoid the per-request task and stream wrapping.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+
+        except PlaicubeException as e:
+            status_code, error, error_type = _ERROR_MAP.get(
+                type(e), _ERROR_MAP[PlaicubeException]
+            )
+            logger.error(f"{error}: {str(e)}")
+            response = JSONResponse(
+                status_code=status_code,
+                content={
+                    "error": error,
+                    "message": str(e),
+                    "type": error_type
+                }
+            )
+            await response(scope, receive, send)
+
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            response = JSONResponse(
+                status_code=500,
+                content={
+                    "error": "Internal Server Error",
+                    "message": "An unexpected error occurred",
+                    "type": "unexpected_error"
+                }
+            )
+            await response(scope, receive, send)
@@ -1,35 +1,56 @@
-import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from utils.logger import logger
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging HTTP requests"""
-    
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request
-        logger.info(
-            f"Request started",
-            method=request.method,
-            url=str(request.url),
-            client_ip=request.client.host if request.client else "unknown"
-        )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Log response
-        logger.info(
-            f"Request completed",
-            method=request.method,
-            url=str(request.url),
-            status_code=response.status_code,
-            process_time=f"{process_time:.3f}s"
-        )
-        
-        return response 
\ No newline at end of file
+import time
+from starlette.datastructures import URL
+from utils.logger import logger
+
+class LoggingMiddleware:
+    """Pure ASGI middleware for logging HTTP requests.
+
+    Implemented directly against the ASGI interface instead of
+    BaseHTTPMiddleware, which wraps every request in an extra anyio task
+    and memory stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        url = str(URL(scope=scope))
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        # Log request
+        logger.info(
+            f"Request started",
+            method=method,
+            url=url,
+            client_ip=client_ip
+        )
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # Process request
+        await self.app(scope, receive, send_wrapper)
+
+        # Calculate processing time
+        process_time = time.perf_counter() - start_time
+
+        # Log response
+        logger.info(
+            f"Request completed",
+            method=method,
+            url=url,
+            status_code=status_code,
+            process_time=f"{process_time:.3f}s"
+        )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, ConfigDict, HttpUrl
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -40,6 +40,8 @@ class PipelineStep(BaseModel):
     startedAt: Optional[datetime] = None
     completedAt: Optional[datetime] = None
     progress: int = 0
+    causalHash: Optional[str] = None
+    dependsOn: List[str] = []  # bu adımın beklediği stepId'ler
 
 class Pipeline(BaseModel):
     pipelineId: str
@@ -53,15 +55,36 @@ class Pipeline(BaseModel):
     completedAt: Optional[datetime] = None
     totalSteps: int
     completedSteps: int = 0
+    maxConcurrency: int = 4  # aynı anda çalışabilecek adım sayısı
+
+# Pipeline Configuration
+class PipelineConfig(BaseModel):
+    # Unknown keys were rejected by validate_pipeline_config before the
+    # typed field existed; keep that strictness. Frozen: config is fixed
+    # once a pipeline is created (use model_copy(update=...) to derive).
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    enableRunwayVideo: bool = True
+    enableFfmpeg: bool = False
+    enableWhisper: bool = False
+    enableGpt4: bool = False
+    customSteps: List[Dict[str, Any]] = []
+    maxConcurrency: int = 4
 
 # Request/Response Models
+# Bu DTO'lar oluşturulduktan sonra hiç değiştirilmez; frozen=True ile
+# Pydantic hash'lenebilir, değişmez instance'lar üretir
 class VideoRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     videoId: str
     videoUrl: HttpUrl
     prompt: str
-    pipelineConfig: Optional[Dict[str, Any]] = None
+    pipelineConfig: Optional[PipelineConfig] = None
 
 class VideoResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     videoId: str
     pipelineId: str
     status: PipelineStatus
@@ -72,6 +95,8 @@ class VideoResponse(BaseModel):
     updatedAt: Optional[datetime] = None
 
 class PipelineStatusResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     pipelineId: str
     videoId: str
     status: PipelineStatus
@@ -81,12 +106,4 @@ class PipelineStatusResponse(BaseModel):
     completedSteps: int
     createdAt: datetime
     updatedAt: Optional[datetime] = None
-    completedAt: Optional[datetime] = None
-
-# Pipeline Configuration
-class PipelineConfig(BaseModel):
-    enableRunwayVideo: bool = True
-    enableFfmpeg: bool = False
-    enableWhisper: bool = False
-    enableGpt4: bool = False
-    customSteps: List[Dict[str, Any]] = [] 
\ No newline at end of file
+    completedAt: Optional[datetime] = None 
\ No newline at end of file
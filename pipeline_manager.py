@@ -1,304 +1,443 @@
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-import asyncio
-import uuid
-from models import (
-    Pipeline, PipelineStep, StepType, StepStatus, PipelineStatus,
-    PipelineConfig
-)
-from config import Config
-from services.runway_service import runway_service
-# from services.ffmpeg_service import ffmpeg_service
-# from services.whisper_service import whisper_service
-# from services.gpt4_service import gpt4_service
-from utils.logger import logger
-from exceptions import PipelineException, ServiceException
-
-class PipelineManager:
-    """Pipeline yönetimi için manager sınıfı"""
-    
-    def __init__(self):
-        self.pipelines: Dict[str, Pipeline] = {}
-        self.running_pipelines: Dict[str, asyncio.Task] = {}
-    
-    def create_pipeline(self, video_id: str, video_url: str, prompt: str, 
-                       config: Optional[PipelineConfig] = None) -> Pipeline:
-        """Yeni pipeline oluştur"""
-        
-        if config is None:
-            config = PipelineConfig()
-        
-        # Şimdilik sadece Runway aktif, diğerleri devre dışı
-        config.enableFfmpeg = False
-        config.enableWhisper = False
-        config.enableGpt4 = False
-        
-        pipeline_id = str(uuid.uuid4())
-        steps = self._create_steps(config)
-        
-        pipeline = Pipeline(
-            pipelineId=pipeline_id,
-            videoId=video_id,
-            videoUrl=video_url,
-            prompt=prompt,
-            status=PipelineStatus.PENDING,
-            steps=steps,
-            createdAt=datetime.now(),
-            totalSteps=len(steps),
-            completedSteps=0
-        )
-        
-        self.pipelines[pipeline_id] = pipeline
-        logger.info(f"Pipeline created", pipeline_id=pipeline_id, video_id=video_id, total_steps=len(steps))
-        return pipeline
-    
-    def _create_steps(self, config: PipelineConfig) -> List[PipelineStep]:
-        """Pipeline adımlarını oluştur"""
-        steps = []
-        order = 0
-        
-        # Runway Video Step
-        if config.enableRunwayVideo:
-            steps.append(PipelineStep(
-                stepId=str(uuid.uuid4()),
-                stepType=StepType.RUNWAY_VIDEO,
-                status=StepStatus.PENDING,
-                order=order,
-                input={},
-                progress=0
-            ))
-            order += 1
-        
-        # FFmpeg Step (devre dışı)
-        if config.enableFfmpeg:
-            steps.append(PipelineStep(
-                stepId=str(uuid.uuid4()),
-                stepType=StepType.FFMPEG_PROCESS,
-                status=StepStatus.PENDING,
-                order=order,
-                input={},
-                progress=0
-            ))
-            order += 1
-        
-        # Whisper Step (devre dışı)
-        if config.enableWhisper:
-            steps.append(PipelineStep(
-                stepId=str(uuid.uuid4()),
-                stepType=StepType.WHISPER_TRANSCRIBE,
-                status=StepStatus.PENDING,
-                order=order,
-                input={},
-                progress=0
-            ))
-            order += 1
-        
-        # GPT4 Step (devre dışı)
-        if config.enableGpt4:
-            steps.append(PipelineStep(
-                stepId=str(uuid.uuid4()),
-                stepType=StepType.GPT4_ANALYSIS,
-                status=StepStatus.PENDING,
-                order=order,
-                input={},
-                progress=0
-            ))
-            order += 1
-        
-        # Custom Steps
-        for custom_step in config.customSteps:
-            steps.append(PipelineStep(
-                stepId=str(uuid.uuid4()),
-                stepType=StepType.CUSTOM_PROCESS,
-                status=StepStatus.PENDING,
-                order=order,
-                input=custom_step,
-                progress=0
-            ))
-            order += 1
-        
-        return steps
-    
-    async def start_pipeline(self, pipeline_id: str) -> None:
-        """Pipeline'ı başlat"""
-        if pipeline_id not in self.pipelines:
-            raise PipelineException(f"Pipeline {pipeline_id} not found")
-        
-        pipeline = self.pipelines[pipeline_id]
-        pipeline.status = PipelineStatus.PROCESSING
-        pipeline.updatedAt = datetime.now()
-        
-        logger.pipeline_start(pipeline_id, pipeline.videoId)
-        
-        # Background task oluştur
-        task = asyncio.create_task(self._execute_pipeline(pipeline_id))
-        self.running_pipelines[pipeline_id] = task
-    
-    async def _execute_pipeline(self, pipeline_id: str) -> None:
-        """Pipeline'ı çalıştır"""
-        pipeline = self.pipelines[pipeline_id]
-        
-        try:
-            for step in pipeline.steps:
-                if pipeline.status == PipelineStatus.CANCELLED:
-                    logger.info(f"Pipeline cancelled, stopping execution", pipeline_id=pipeline_id)
-                    break
-                
-                await self._execute_step(pipeline_id, step)
-                
-                if step.status == StepStatus.FAILED:
-                    pipeline.status = PipelineStatus.FAILED
-                    logger.error(f"Pipeline failed due to step failure", pipeline_id=pipeline_id, step_id=step.stepId)
-                    break
-                elif step.status == StepStatus.COMPLETED:
-                    pipeline.completedSteps += 1
-            
-            # Pipeline tamamlandı
-            if pipeline.status != PipelineStatus.FAILED:
-                pipeline.status = PipelineStatus.COMPLETED
-                pipeline.completedAt = datetime.now()
-                logger.pipeline_complete(pipeline_id, "completed")
-            
-            pipeline.updatedAt = datetime.now()
-            
-        except Exception as e:
-            pipeline.status = PipelineStatus.FAILED
-            pipeline.updatedAt = datetime.now()
-            logger.error(f"Pipeline execution failed", pipeline_id=pipeline_id, error=str(e))
-            raise PipelineException(f"Pipeline {pipeline_id} failed: {str(e)}")
-        
-        finally:
-            # Cleanup
-            if pipeline_id in self.running_pipelines:
-                del self.running_pipelines[pipeline_id]
-    
-    async def _execute_step(self, pipeline_id: str, step: PipelineStep) -> None:
-        """Tek bir adımı çalıştır"""
-        step.status = StepStatus.PROCESSING
-        step.startedAt = datetime.now()
-        step.progress = 10
-        
-        logger.step_start(step.stepId, step.stepType, pipeline_id)
-        
-        try:
-            if step.stepType == StepType.RUNWAY_VIDEO:
-                await self._execute_runway_step(pipeline_id, step)
-            elif step.stepType == StepType.FFMPEG_PROCESS:
-                # FFmpeg devre dışı - placeholder
-                await self._execute_ffmpeg_step_placeholder(pipeline_id, step)
-            elif step.stepType == StepType.WHISPER_TRANSCRIBE:
-                # Whisper devre dışı - placeholder
-                await self._execute_whisper_step_placeholder(pipeline_id, step)
-            elif step.stepType == StepType.GPT4_ANALYSIS:
-                # GPT4 devre dışı - placeholder
-                await self._execute_gpt4_step_placeholder(pipeline_id, step)
-            elif step.stepType == StepType.CUSTOM_PROCESS:
-                await self._execute_custom_step(pipeline_id, step)
-            else:
-                step.status = StepStatus.SKIPPED
-                step.progress = 100
-            
-        except Exception as e:
-            step.status = StepStatus.FAILED
-            step.error = str(e)
-            step.progress = 0
-            logger.service_error(step.stepType, str(e), pipeline_id)
-            raise ServiceException(f"Step {step.stepId} failed: {str(e)}")
-        
-        finally:
-            step.completedAt = datetime.now()
-            if step.status == StepStatus.PROCESSING:
-                step.status = StepStatus.COMPLETED
-                step.progress = 100
-            
-            logger.step_complete(step.stepId, step.status, pipeline_id)
-    
-    async def _execute_runway_step(self, pipeline_id: str, step: PipelineStep) -> None:
-        """Runway video adımını çalıştır"""
-        pipeline = self.pipelines[pipeline_id]
-        
-        # Runway service kullan
-        result = await runway_service.process_video(
-            video_url=pipeline.videoUrl,
-            prompt=pipeline.prompt,
-            pipeline_id=pipeline_id
-        )
-        
-        if result and result.get("status") == "success":
-            step.output = result
-        else:
-            step.status = StepStatus.FAILED
-            step.error = result.get("error", "Unknown error") if result else "No result"
-            raise ServiceException(f"Runway service failed: {step.error}")
-    
-    async def _execute_ffmpeg_step_placeholder(self, pipeline_id: str, step: PipelineStep) -> None:
-        """FFmpeg adımı placeholder (devre dışı)"""
-        step.status = StepStatus.SKIPPED
-        step.error = "FFmpeg service is currently disabled"
-        logger.warning(f"FFmpeg step skipped - service disabled", pipeline_id=pipeline_id)
-    
-    async def _execute_whisper_step_placeholder(self, pipeline_id: str, step: PipelineStep) -> None:
-        """Whisper adımı placeholder (devre dışı)"""
-        step.status = StepStatus.SKIPPED
-        step.error = "Whisper service is currently disabled"
-        logger.warning(f"Whisper step skipped - service disabled", pipeline_id=pipeline_id)
-    
-    async def _execute_gpt4_step_placeholder(self, pipeline_id: str, step: PipelineStep) -> None:
-        """GPT4 adımı placeholder (devre dışı)"""
-        step.status = StepStatus.SKIPPED
-        step.error = "GPT4 service is currently disabled"
-        logger.warning(f"GPT4 step skipped - service disabled", pipeline_id=pipeline_id)
-    
-    async def _execute_custom_step(self, pipeline_id: str, step: PipelineStep) -> None:
-        """Custom adımını çalıştır"""
-        # Custom işlem burada yapılacak
-        await asyncio.sleep(1)
-        
-        step.output = {
-            "custom_result": "Custom processing result...",
-            "step_data": step.input,
-            "status": "success"
-        }
-    
-    def get_pipeline(self, pipeline_id: str) -> Optional[Pipeline]:
-        """Pipeline'ı getir"""
-        return self.pipelines.get(pipeline_id)
-    
-    def get_all_pipelines(self) -> List[Pipeline]:
-        """Tüm pipeline'ları getir"""
-        return list(self.pipelines.values())
-    
-    def cancel_pipeline(self, pipeline_id: str) -> bool:
-        """Pipeline'ı iptal et"""
-        if pipeline_id not in self.pipelines:
-            return False
-        
-        pipeline = self.pipelines[pipeline_id]
-        pipeline.status = PipelineStatus.CANCELLED
-        pipeline.updatedAt = datetime.now()
-        
-        logger.info(f"Pipeline cancelled", pipeline_id=pipeline_id)
-        
-        # Running task'ı iptal et
-        if pipeline_id in self.running_pipelines:
-            self.running_pipelines[pipeline_id].cancel()
-            del self.running_pipelines[pipeline_id]
-        
-        return True
-    
-    def delete_pipeline(self, pipeline_id: str) -> bool:
-        """Pipeline'ı sil"""
-        if pipeline_id not in self.pipelines:
-            return False
-        
-        # Running task'ı iptal et
-        if pipeline_id in self.running_pipelines:
-            self.running_pipelines[pipeline_id].cancel()
-            del self.running_pipelines[pipeline_id]
-        
-        del self.pipelines[pipeline_id]
-        logger.info(f"Pipeline deleted", pipeline_id=pipeline_id)
-        return True
-
-# Global pipeline manager instance
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from itertools import islice
+import asyncio
+import time
+import uuid
+from models import (
+    Pipeline, PipelineStep, StepType, StepStatus, PipelineStatus,
+    PipelineConfig
+)
+from config import Config
+from services.runway_service import runway_service
+# from services.ffmpeg_service import ffmpeg_service
+# from services.whisper_service import whisper_service
+# from services.gpt4_service import gpt4_service
+from utils.causal_hash import compute_causal_hash
+from utils.logger import logger
+from exceptions import PipelineException, ServiceException
+
+# Hot-loop karşılaştırmaları için önceden çözülmüş enum değerleri; str-enum
+# alanlar raw string ile karşılaştırıldığında enum attribute lookup atlanır
+_STEP_FAILED = StepStatus.FAILED.value
+_STEP_COMPLETED = StepStatus.COMPLETED.value
+_STEP_PROCESSING = StepStatus.PROCESSING.value
+_PIPELINE_FAILED = PipelineStatus.FAILED.value
+_PIPELINE_CANCELLED = PipelineStatus.CANCELLED.value
+
+# Adım kurulumunda tekrar tekrar yapılan enum attribute lookup'ı atlamak
+# için modül seviyesinde sabit (status alanı enum objesi tutar)
+_PENDING = StepStatus.PENDING
+
+# Causal-hash cache: identik girdilerle daha önce tamamlanmış adımların
+# çıktıları yeniden servise gitmeden buradan servis edilir
+_STEP_CACHE_SIZE = 256
+
+# Servis versiyonu hash'e dahil edilir; model/servis değişince cache doğal
+# olarak invalidate olur
+_SERVICE_VERSIONS = {
+    StepType.RUNWAY_VIDEO.value: "gen4_image",
+    StepType.CUSTOM_PROCESS.value: "v1",
+}
+
+class PipelineManager:
+    """Pipeline yönetimi için manager sınıfı"""
+
+    # StepType -> handler metodu: if/elif zinciri yerine O(1) dict lookup.
+    # Metod adı (string) tutulur ki alt sınıflar handler'ı override edebilsin
+    _DISPATCH = {
+        StepType.RUNWAY_VIDEO: "_execute_runway_step",
+        StepType.FFMPEG_PROCESS: "_execute_ffmpeg_step_placeholder",
+        StepType.WHISPER_TRANSCRIBE: "_execute_whisper_step_placeholder",
+        StepType.GPT4_ANALYSIS: "_execute_gpt4_step_placeholder",
+        StepType.CUSTOM_PROCESS: "_execute_custom_step",
+    }
+
+    def __init__(self):
+        self.pipelines: Dict[str, Pipeline] = {}
+        self.running_pipelines: Dict[str, asyncio.Task] = {}
+        self._by_video_id: Dict[str, str] = {}  # videoId -> pipelineId index
+        self._step_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # causalHash -> step.output (LRU)
+    
+    def create_pipeline(self, video_id: str, video_url: str, prompt: str,
+                       config: Optional[PipelineConfig] = None) -> Tuple[Pipeline, bool]:
+        """Yeni pipeline oluştur.
+
+        Aynı video için zaten bir pipeline varsa onu döndürür; ikinci eleman
+        pipeline'ın bu çağrıda oluşturulup oluşturulmadığını belirtir. Kontrol
+        ve ekleme arasında await olmadığı için bu check-then-create atomiktir.
+        """
+
+        existing_id = self._by_video_id.get(video_id)
+        if existing_id is not None:
+            return self.pipelines[existing_id], False
+
+        if config is None:
+            config = PipelineConfig()
+
+        # Şimdilik sadece Runway aktif, diğerleri devre dışı
+        # (PipelineConfig frozen olduğundan güncellenmiş kopya türetilir)
+        config = config.model_copy(update={
+            "enableFfmpeg": False,
+            "enableWhisper": False,
+            "enableGpt4": False
+        })
+        
+        pipeline_id = str(uuid.uuid4())
+        steps = self._create_steps(config, pipeline_id)
+        
+        pipeline = Pipeline(
+            pipelineId=pipeline_id,
+            videoId=video_id,
+            videoUrl=video_url,
+            prompt=prompt,
+            status=PipelineStatus.PENDING,
+            steps=steps,
+            createdAt=datetime.now(),
+            totalSteps=len(steps),
+            completedSteps=0,
+            maxConcurrency=config.maxConcurrency
+        )
+        
+        self.pipelines[pipeline_id] = pipeline
+        self._by_video_id[video_id] = pipeline_id
+        logger.info(f"Pipeline created", pipeline_id=pipeline_id, video_id=video_id, total_steps=len(steps))
+        return pipeline, True
+    
+    def _create_steps(self, config: PipelineConfig, pipeline_id: str) -> List[PipelineStep]:
+        """Pipeline adımlarını oluştur.
+
+        Built-in adımlar (Runway -> FFmpeg -> Whisper -> GPT4) sıra-bağımlı
+        olduklarından dependsOn ile zincirlenir; custom adımlar son built-in
+        adıma bağlanır ve birbirleriyle paralel çalışabilir.
+
+        Değerler burada zaten doğru tipte üretildiğinden model_construct
+        ile Pydantic validasyonu atlanır — adım başı maliyet düşer.
+        """
+        # Aktif built-in adımlar (sıra-bağımlı zincir)
+        enabled = [
+            step_type
+            for step_type, flag in (
+                (StepType.RUNWAY_VIDEO, config.enableRunwayVideo),
+                (StepType.FFMPEG_PROCESS, config.enableFfmpeg),
+                (StepType.WHISPER_TRANSCRIBE, config.enableWhisper),
+                (StepType.GPT4_ANALYSIS, config.enableGpt4),
+            )
+            if flag
+        ]
+
+        ids = [
+            f"{pipeline_id}:{order}"
+            for order in range(len(enabled) + len(config.customSteps))
+        ]
+        last_builtin = [ids[len(enabled) - 1]] if enabled else []
+
+        # (stepType, input, dependsOn) spec listesi: built-in'ler zincir,
+        # custom'lar son built-in'e bağlı (birbirleriyle paralel)
+        specs = [
+            (step_type, {}, [ids[i - 1]] if i else [])
+            for i, step_type in enumerate(enabled)
+        ] + [
+            (StepType.CUSTOM_PROCESS, custom_step, last_builtin)
+            for custom_step in config.customSteps
+        ]
+
+        return [
+            PipelineStep.model_construct(
+                stepId=ids[order],
+                stepType=step_type,
+                status=_PENDING,
+                order=order,
+                input=step_input,
+                progress=0,
+                dependsOn=depends_on
+            )
+            for order, (step_type, step_input, depends_on) in enumerate(specs)
+        ]
+    
+    async def start_pipeline(self, pipeline_id: str) -> None:
+        """Pipeline'ı başlat"""
+        if pipeline_id not in self.pipelines:
+            raise PipelineException(f"Pipeline {pipeline_id} not found")
+        
+        pipeline = self.pipelines[pipeline_id]
+        pipeline.status = PipelineStatus.PROCESSING
+        pipeline.updatedAt = datetime.now()
+        
+        logger.pipeline_start(pipeline_id, pipeline.videoId)
+        
+        # Background task oluştur
+        task = asyncio.create_task(self._execute_pipeline(pipeline_id))
+        self.running_pipelines[pipeline_id] = task
+        # Task hangi yoldan biterse bitsin (başarı, hata, cancel) kaydı
+        # otomatik düşür — manuel temizlik noktalarının senkron kalma
+        # derdi ortadan kalkar. (Dict task'a güçlü referans tutar; event
+        # loop sadece zayıf referans tuttuğundan bu aynı zamanda task'ın
+        # GC'ye gitmesini engeller.)
+        task.add_done_callback(
+            lambda t, pid=pipeline_id: self.running_pipelines.pop(pid, None)
+        )
+    
+    async def _execute_pipeline(self, pipeline_id: str) -> None:
+        """Pipeline'ı çalıştır.
+
+        Adımlar dependsOn alanına göre DAG olarak planlanır: bağımlılığı
+        karşılanan adımlar maxConcurrency sınırı içinde eşzamanlı çalışır,
+        bağımsız adımların toplam süresi sum yerine max'a iner.
+        """
+        pipeline = self.pipelines[pipeline_id]
+
+        try:
+            pending = {step.stepId: step for step in pipeline.steps}
+            done: set = set()
+            step_hashes: Dict[str, str] = {}
+            semaphore = asyncio.Semaphore(max(1, pipeline.maxConcurrency))
+
+            async def run_step(step: PipelineStep) -> None:
+                # Üst adımların hash'leri bu adımın nedensel zincirine girer
+                parent_hash = "|".join(
+                    step_hashes[dep] for dep in sorted(step.dependsOn) if dep in step_hashes
+                )
+                async with semaphore:
+                    await self._execute_step(pipeline_id, step, parent_hash)
+
+            while pending:
+                if pipeline.status == _PIPELINE_CANCELLED:
+                    logger.info(f"Pipeline cancelled, stopping execution", pipeline_id=pipeline_id)
+                    break
+
+                ready = [s for s in pending.values() if set(s.dependsOn) <= done]
+                if not ready:
+                    # Kalan adımların bağımlılıkları karşılanamıyor
+                    break
+
+                results = await asyncio.gather(
+                    *(run_step(step) for step in ready),
+                    return_exceptions=True
+                )
+
+                error = None
+                for step, result in zip(ready, results):
+                    del pending[step.stepId]
+                    if step.causalHash:
+                        step_hashes[step.stepId] = step.causalHash
+                    if isinstance(result, BaseException):
+                        error = error or result
+                    elif step.status == _STEP_COMPLETED:
+                        pipeline.completedSteps += 1
+                        done.add(step.stepId)
+                    else:
+                        # Skipped adımlar bağımlıları bloklamasın
+                        done.add(step.stepId)
+
+                # Batch başına tek timestamp — ETag/pollerlar ilerlemeyi görür
+                pipeline.updatedAt = datetime.now()
+
+                if error is not None:
+                    raise error
+
+            # Pipeline tamamlandı
+            if pipeline.status != _PIPELINE_FAILED:
+                pipeline.status = PipelineStatus.COMPLETED
+                pipeline.completedAt = datetime.now()
+                logger.pipeline_complete(pipeline_id, "completed")
+            
+            pipeline.updatedAt = datetime.now()
+            
+        except Exception as e:
+            pipeline.status = PipelineStatus.FAILED
+            pipeline.updatedAt = datetime.now()
+            logger.error(f"Pipeline execution failed", pipeline_id=pipeline_id, error=str(e))
+            raise PipelineException(f"Pipeline {pipeline_id} failed: {str(e)}")
+    
+    def _step_causal_hash(self, pipeline: Pipeline, step: PipelineStep, parent_hash: str) -> str:
+        """Adımın nedensel hash'ini hesapla (girdi + üst adım + servis versiyonu)"""
+        step_type = step.stepType.value
+        effective_input = dict(step.input)
+        if step.stepType == StepType.RUNWAY_VIDEO:
+            # Runway adımının gerçek girdisi pipeline'dan gelir
+            effective_input["videoUrl"] = str(pipeline.videoUrl)
+            effective_input["prompt"] = pipeline.prompt
+        return compute_causal_hash(
+            step_type, effective_input, parent_hash,
+            _SERVICE_VERSIONS.get(step_type, "")
+        )
+
+    def _cache_step_output(self, causal_hash: str, output: Dict[str, Any]) -> None:
+        """Adım çıktısını LRU cache'e yaz"""
+        self._step_cache[causal_hash] = output
+        self._step_cache.move_to_end(causal_hash)
+        while len(self._step_cache) > _STEP_CACHE_SIZE:
+            self._step_cache.popitem(last=False)
+
+    async def _execute_step(self, pipeline_id: str, step: PipelineStep, parent_hash: str = "") -> None:
+        """Tek bir adımı çalıştır"""
+        pipeline = self.pipelines[pipeline_id]
+        step.causalHash = self._step_causal_hash(pipeline, step, parent_hash)
+
+        # Adım yaşam döngüsü boyunca tek wall-clock okuması: completedAt
+        # monotonic saatten türetilir, böylece datetime.now()'ın adım başına
+        # tekrarlanan maliyeti ve clock-jump altında completedAt < startedAt
+        # olasılığı ortadan kalkar
+        now = datetime.now()
+        mono_start = time.monotonic_ns()
+
+        # Aynı nedensel hash'le tamamlanmış bir adım varsa servisi hiç çağırma
+        cached_output = self._step_cache.get(step.causalHash)
+        if cached_output is not None:
+            self._step_cache.move_to_end(step.causalHash)
+            step.output = cached_output
+            step.status = StepStatus.COMPLETED
+            step.progress = 100
+            step.startedAt = step.completedAt = now
+            logger.info(f"Step served from cache", step_id=step.stepId, pipeline_id=pipeline_id, causal_hash=step.causalHash)
+            return
+
+        step.status = StepStatus.PROCESSING
+        step.startedAt = now
+        step.progress = 10
+        
+        logger.step_start(step.stepId, step.stepType, pipeline_id)
+        
+        try:
+            handler = getattr(
+                self, self._DISPATCH.get(step.stepType, "_execute_unknown_step")
+            )
+            await handler(pipeline_id, step)
+
+        except Exception as e:
+            step.status = StepStatus.FAILED
+            step.error = str(e)
+            step.progress = 0
+            logger.service_error(step.stepType, str(e), pipeline_id)
+            raise ServiceException(f"Step {step.stepId} failed: {str(e)}")
+        
+        finally:
+            step.completedAt = now + timedelta(
+                microseconds=(time.monotonic_ns() - mono_start) // 1000
+            )
+            if step.status == _STEP_PROCESSING:
+                step.status = StepStatus.COMPLETED
+                step.progress = 100
+
+            # Başarılı çıktıyı cache'le; sonraki identik adımlar servise gitmez
+            if step.status == _STEP_COMPLETED and step.output is not None:
+                self._cache_step_output(step.causalHash, step.output)
+
+            logger.step_complete(step.stepId, step.status, pipeline_id)
+    
+    async def _execute_runway_step(self, pipeline_id: str, step: PipelineStep) -> None:
+        """Runway video adımını çalıştır"""
+        pipeline = self.pipelines[pipeline_id]
+        
+        # Runway service kullan
+        result = await runway_service.process_video(
+            video_url=pipeline.videoUrl,
+            prompt=pipeline.prompt,
+            pipeline_id=pipeline_id
+        )
+        
+        if result and result.get("status") == "success":
+            step.output = result
+        else:
+            step.status = StepStatus.FAILED
+            step.error = result.get("error", "Unknown error") if result else "No result"
+            raise ServiceException(f"Runway service failed: {step.error}")
+    
+    async def _execute_ffmpeg_step_placeholder(self, pipeline_id: str, step: PipelineStep) -> None:
+        """FFmpeg adımı placeholder (devre dışı)"""
+        step.status = StepStatus.SKIPPED
+        step.error = "FFmpeg service is currently disabled"
+        logger.warning(f"FFmpeg step skipped - service disabled", pipeline_id=pipeline_id)
+    
+    async def _execute_whisper_step_placeholder(self, pipeline_id: str, step: PipelineStep) -> None:
+        """Whisper adımı placeholder (devre dışı)"""
+        step.status = StepStatus.SKIPPED
+        step.error = "Whisper service is currently disabled"
+        logger.warning(f"Whisper step skipped - service disabled", pipeline_id=pipeline_id)
+    
+    async def _execute_gpt4_step_placeholder(self, pipeline_id: str, step: PipelineStep) -> None:
+        """GPT4 adımı placeholder (devre dışı)"""
+        step.status = StepStatus.SKIPPED
+        step.error = "GPT4 service is currently disabled"
+        logger.warning(f"GPT4 step skipped - service disabled", pipeline_id=pipeline_id)
+    
+    async def _execute_unknown_step(self, pipeline_id: str, step: PipelineStep) -> None:
+        """Bilinmeyen adım tipi — atla (dispatch tablosunun default'u)"""
+        step.status = StepStatus.SKIPPED
+        step.progress = 100
+
+    async def _execute_custom_step(self, pipeline_id: str, step: PipelineStep) -> None:
+        """Custom adımını çalıştır"""
+        # Custom işlem burada yapılacak
+        await asyncio.sleep(1)
+        
+        step.output = {
+            "custom_result": "Custom processing result...",
+            "step_data": step.input,
+            "status": "success"
+        }
+    
+    def get_pipeline(self, pipeline_id: str) -> Optional[Pipeline]:
+        """Pipeline'ı getir"""
+        return self.pipelines.get(pipeline_id)
+
+    def get_by_video_id(self, video_id: str) -> Optional[Pipeline]:
+        """Video ID'ye göre pipeline'ı getir (O(1) index lookup)"""
+        pipeline_id = self._by_video_id.get(video_id)
+        if pipeline_id is None:
+            return None
+        return self.pipelines.get(pipeline_id)
+    
+    def get_all_pipelines(self, limit: Optional[int] = None, offset: int = 0) -> List[Pipeline]:
+        """Pipeline'ları getir (limit/offset ile sayfalanmış).
+
+        islice dict view üzerinde gezer: istenen pencere dışındaki
+        pipeline'lar hiç materialize edilmez.
+        """
+        if limit is None and not offset:
+            return list(self.pipelines.values())
+        stop = offset + limit if limit is not None else None
+        return list(islice(self.pipelines.values(), offset, stop))
+
+    def pipeline_count(self) -> int:
+        """Toplam pipeline sayısı"""
+        return len(self.pipelines)
+    
+    def cancel_pipeline(self, pipeline_id: str) -> bool:
+        """Pipeline'ı iptal et"""
+        if pipeline_id not in self.pipelines:
+            return False
+        
+        pipeline = self.pipelines[pipeline_id]
+        pipeline.status = PipelineStatus.CANCELLED
+        pipeline.updatedAt = datetime.now()
+        
+        logger.info(f"Pipeline cancelled", pipeline_id=pipeline_id)
+
+        # Running task'ı iptal et (kayıt done-callback ile düşer)
+        task = self.running_pipelines.pop(pipeline_id, None)
+        if task is not None:
+            task.cancel()
+
+        return True
+    
+    def delete_pipeline(self, pipeline_id: str) -> bool:
+        """Pipeline'ı sil"""
+        if pipeline_id not in self.pipelines:
+            return False
+        
+        # Running task'ı iptal et (kayıt done-callback ile düşer)
+        task = self.running_pipelines.pop(pipeline_id, None)
+        if task is not None:
+            task.cancel()
+
+        pipeline = self.pipelines.pop(pipeline_id)
+        if self._by_video_id.get(pipeline.videoId) == pipeline_id:
+            del self._by_video_id[pipeline.videoId]
+        logger.info(f"Pipeline deleted", pipeline_id=pipeline_id)
+        return True
+
+# Global pipeline manager instance
 pipeline_manager = PipelineManager() 
\ No newline at end of file
@@ -11,10 +11,21 @@ from utils.logger import logger
 if __name__ == "__main__":
     logger.info("🚀 Starting Plaicube Video Pipeline API...")
     logger.info(f"Server will run on http://{Config.HOST}:{Config.PORT}")
-    
+
+    # uvloop (libuv) + httptools: asyncio-ağırlıklı iş yükünde (httpx,
+    # subprocess pipe'ları, gather) stdlib loop'a göre 2-4x daha hızlı
+    # task scheduling. Kurulu değilse (örn. Windows) stdlib'e düşülür.
+    try:
+        import uvloop  # noqa: F401
+        loop_impl, http_impl = "uvloop", "httptools"
+    except ImportError:
+        loop_impl, http_impl = "asyncio", "auto"
+
     uvicorn.run(
-        app, 
-        host=Config.HOST, 
+        app,
+        host=Config.HOST,
         port=Config.PORT,
-        log_level=Config.LOG_LEVEL.lower()
+        log_level=Config.LOG_LEVEL.lower(),
+        loop=loop_impl,
+        http=http_impl
     ) 
\ No newline at end of file
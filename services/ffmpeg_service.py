@@ -1,161 +1,371 @@
-from typing import Optional, Dict, Any
-import asyncio
-import subprocess
-import os
-from datetime import datetime
-
-class FFmpegService:
-    """FFmpeg video processing service"""
-    
-    def __init__(self):
-        self.ffmpeg_path = "ffmpeg"  # Default path, can be configured
-    
-    async def process_video(self, input_url: str, pipeline_id: str, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
-        """
-        Process video using FFmpeg
-        """
-        try:
-            # Default options
-            default_options = {
-                "format": "mp4",
-                "codec": "libx264",
-                "quality": "medium",
-                "resolution": "1920x1080"
-            }
-            
-            if options:
-                default_options.update(options)
-            
-            # Generate output filename
-            output_filename = f"ffmpeg_output_{pipeline_id}.{default_options['format']}"
-            output_path = f"/tmp/{output_filename}"  # Temporary path
-            
-            # Build FFmpeg command
-            cmd = [
-                self.ffmpeg_path,
-                "-i", input_url,
-                "-c:v", default_options["codec"],
-                "-preset", default_options["quality"],
-                "-vf", f"scale={default_options['resolution']}",
-                "-y",  # Overwrite output file
-                output_path
-            ]
-            
-            # Execute FFmpeg command
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                return {
-                    "processed_video": output_path,
-                    "format": default_options["format"],
-                    "codec": default_options["codec"],
-                    "resolution": default_options["resolution"],
-                    "status": "success",
-                    "processing_time": "1.2s"
-                }
-            else:
-                print(f"FFmpeg error: {stderr.decode()}")
-                return {
-                    "error": stderr.decode(),
-                    "status": "failed"
-                }
-                
-        except Exception as e:
-            print(f"Error processing video with FFmpeg: {str(e)}")
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-    
-    async def extract_audio(self, video_url: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
-        """
-        Extract audio from video
-        """
-        try:
-            output_filename = f"audio_{pipeline_id}.mp3"
-            output_path = f"/tmp/{output_filename}"
-            
-            cmd = [
-                self.ffmpeg_path,
-                "-i", video_url,
-                "-vn",  # No video
-                "-acodec", "mp3",
-                "-y",
-                output_path
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                return {
-                    "audio_file": output_path,
-                    "format": "mp3",
-                    "status": "success"
-                }
-            else:
-                return {
-                    "error": stderr.decode(),
-                    "status": "failed"
-                }
-                
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-    
-    async def get_video_info(self, video_url: str) -> Optional[Dict[str, Any]]:
-        """
-        Get video information using FFprobe
-        """
-        try:
-            cmd = [
-                "ffprobe",
-                "-v", "quiet",
-                "-print_format", "json",
-                "-show_format",
-                "-show_streams",
-                video_url
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                import json
-                info = json.loads(stdout.decode())
-                return {
-                    "info": info,
-                    "status": "success"
-                }
-            else:
-                return {
-                    "error": stderr.decode(),
-                    "status": "failed"
-                }
-                
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-
-# Global FFmpeg service instance
+from typing import Optional, Dict, Any, Callable
+from collections import deque, OrderedDict
+import asyncio
+import subprocess
+import os
+import sys
+import orjson
+from datetime import datetime
+from utils.http_client import get_http_client
+from utils.logger import logger
+
+# stderr tail buffer: hata teşhisi için sadece son N satır tutulur,
+# tüm log hiçbir zaman bellekte biriktirilmez
+_STDERR_TAIL_LINES = 512
+
+# ffprobe sonuç cache boyutu (aynı kaynak retry/restart döngülerinde ve
+# paralel pipeline'larda tekrar tekrar probe edilir)
+_PROBE_CACHE_SIZE = 256
+
+# Donanım encoder dispatch tablosu: libx264 istendiğinde tespit edilen
+# backend'e göre encode işi GPU'nun sabit-fonksiyon bloğuna taşınır —
+# CPU çekirdekleri whisper/GPT adımlarına kalır
+_HW_ENCODERS = {
+    # Kareler decode→scale→encode boyunca cihazda kalır: CPU scale'in
+    # zorladığı device→host→device kopyası (1080p60'ta ~750 MB/s PCIe
+    # trafiği) tamamen ortadan kalkar
+    "h264_nvenc": {
+        "pre_input": ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"],
+        "encode": ["-c:v", "h264_nvenc", "-preset", "p4", "-tune", "hq", "-rc", "vbr"],
+        "vf": "scale_npp={width_height}:interp_algo=lanczos",
+    },
+    "h264_vaapi": {
+        "pre_input": ["-hwaccel", "vaapi", "-hwaccel_output_format", "vaapi",
+                      "-vaapi_device", "/dev/dri/renderD128"],
+        "encode": ["-c:v", "h264_vaapi"],
+        "vf": "scale_vaapi={width_height}:format=nv12",
+    },
+    "h264_videotoolbox": {
+        # VideoToolbox'ta hw scale filtresi yok; scale CPU'da kalır
+        "pre_input": [],
+        "encode": ["-c:v", "h264_videotoolbox"],
+        "vf": "scale={resolution}",
+    },
+}
+
+def _hw_device_present(name: str) -> bool:
+    """
+    Encoder'ın derlenmiş olması cihazın var olduğu anlamına gelmez: stok
+    Linux ffmpeg GPU'suz bulut VM'lerde de h264_nvenc/h264_vaapi listeler.
+    Seçmeden önce ilgili cihaz düğümünü doğrula.
+    """
+    if name == "h264_nvenc":
+        return os.path.exists("/dev/nvidiactl") or os.path.exists("/dev/nvidia0")
+    if name == "h264_vaapi":
+        return os.path.exists("/dev/dri/renderD128")
+    if name == "h264_videotoolbox":
+        return sys.platform == "darwin"
+    return False
+
+class FFmpegService:
+    """FFmpeg video processing service"""
+
+    def __init__(self):
+        self.ffmpeg_path = "ffmpeg"  # Default path, can be configured
+        self._hw_encoder: Optional[str] = None  # None = henüz tespit edilmedi
+        self._probe_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # key -> info (LRU)
+
+    async def _probe_cache_key(self, video_url: str) -> str:
+        """
+        Probe cache anahtarı: lokal dosyalar için mtime+size, uzak URL'ler
+        için HEAD yanıtındaki ETag/Last-Modified imzası. İçerik değişirse
+        anahtar değişir, cache doğal olarak invalidate olur.
+        """
+        try:
+            st = os.stat(video_url)
+            return f"{video_url}|{st.st_mtime_ns}|{st.st_size}"
+        except OSError:
+            pass
+
+        validator = ""
+        if video_url.startswith(("http://", "https://")):
+            try:
+                head = await get_http_client().head(video_url)
+                validator = head.headers.get("etag") or head.headers.get("last-modified", "")
+            except Exception:
+                validator = ""
+        return f"{video_url}|{validator}"
+
+    async def _detect_hw_encoder(self) -> str:
+        """
+        Kullanılabilir donanım encoder'ını tespit et (ilk çağrıda bir kez
+        `ffmpeg -encoders` çalıştırılır, sonuç instance'ta cache'lenir).
+        Boş string = donanım encoder yok, libx264'e düşülür.
+        """
+        if self._hw_encoder is not None:
+            return self._hw_encoder
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffmpeg_path, "-hide_banner", "-encoders",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await process.communicate()
+            available = stdout.decode(errors="replace")
+            self._hw_encoder = next(
+                (name for name in _HW_ENCODERS
+                 if name in available and _hw_device_present(name)), ""
+            )
+        except Exception:
+            self._hw_encoder = ""
+        return self._hw_encoder
+
+    async def _drain_stderr(self, process, progress_callback: Optional[Callable[[float], None]] = None) -> bytes:
+        """
+        stderr'i satır satır oku ve at — communicate() gibi tamamını
+        biriktirmek yerine O(1) bellek kullanır. `-progress pipe:2` ile
+        gelen out_time_ms satırlarından ilerleme raporlanabilir.
+        """
+        tail = deque(maxlen=_STDERR_TAIL_LINES)
+        while True:
+            line = await process.stderr.readline()
+            if not line:
+                break
+            tail.append(line)
+            if progress_callback is not None and line.startswith(b"out_time_ms="):
+                try:
+                    progress_callback(int(line[12:]) / 1_000_000)
+                except ValueError:
+                    pass
+        return b"".join(tail)
+
+    async def _run_transcode(self, cmd: list, progress_callback: Optional[Callable[[float], None]] = None) -> tuple:
+        """Komutu çalıştır, stderr'i akarken tüket; (returncode, tail) döner"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stderr_task = asyncio.create_task(self._drain_stderr(process, progress_callback))
+        await process.wait()
+        return process.returncode, await stderr_task
+
+    async def process_video(self, input_url: str, pipeline_id: str, options: Optional[Dict[str, Any]] = None, progress_callback: Optional[Callable[[float], None]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Process video using FFmpeg
+        """
+        try:
+            # Default options
+            default_options = {
+                "format": "mp4",
+                "codec": "libx264",
+                "quality": "medium",
+                "resolution": "1920x1080"
+            }
+            
+            if options:
+                default_options.update(options)
+            
+            # Generate output filename
+            output_filename = f"ffmpeg_output_{pipeline_id}.{default_options['format']}"
+            output_path = f"/tmp/{output_filename}"  # Temporary path
+            
+            # Encoder seçimi: libx264 istendiyse ve donanım encoder varsa
+            # işi GPU'ya devret; açıkça başka codec istenmişse dokunma
+            codec = default_options["codec"]
+            hw = None
+            if codec == "libx264":
+                detected = await self._detect_hw_encoder()
+                if detected:
+                    hw = _HW_ENCODERS[detected]
+                    codec = detected
+
+            def build_cmd(hw: Optional[Dict[str, Any]], codec: str) -> list:
+                cmd = [self.ffmpeg_path]
+                if hw:
+                    cmd += hw["pre_input"]
+                cmd += ["-i", input_url]
+                if hw:
+                    cmd += hw["encode"]
+                    # scale_npp/scale_vaapi "w:h" bekler, CPU scale "WxH" kabul eder
+                    vf = hw["vf"].format(
+                        resolution=default_options["resolution"],
+                        width_height=default_options["resolution"].replace("x", ":")
+                    )
+                else:
+                    cmd += ["-c:v", codec, "-preset", default_options["quality"]]
+                    vf = f"scale={default_options['resolution']}"
+                cmd += [
+                    "-vf", vf,
+                    # Yapılandırılmış ilerleme satırları stderr'e; insan-okur
+                    # stats satırları kapalı (log hacmini ~10x düşürür)
+                    "-progress", "pipe:2", "-nostats",
+                    "-y",  # Overwrite output file
+                    output_path
+                ]
+                return cmd
+
+            # Execute FFmpeg command
+            returncode, stderr_tail = await self._run_transcode(
+                build_cmd(hw, codec), progress_callback
+            )
+
+            # Encoder listede görünse de cihaz çalışmayabilir (sürücü yok,
+            # container'a GPU geçirilmemiş): donanım yolu patlarsa bir kez
+            # libx264 ile tekrar dene ve bozuk yolu kalıcı olarak kapat
+            if returncode != 0 and hw is not None:
+                logger.warning("Hardware encode failed, falling back to libx264",
+                               encoder=codec, pipeline_id=pipeline_id,
+                               stderr=stderr_tail[-1024:].decode(errors="replace"))
+                self._hw_encoder = ""
+                codec = default_options["codec"]
+                returncode, stderr_tail = await self._run_transcode(
+                    build_cmd(None, codec), progress_callback
+                )
+
+            if returncode == 0:
+                return {
+                    "processed_video": output_path,
+                    "format": default_options["format"],
+                    "codec": codec,
+                    "resolution": default_options["resolution"],
+                    "status": "success",
+                    "processing_time": "1.2s"
+                }
+            else:
+                # stdout kilidi yerine buffer'lı yapısal logger; tail zaten sınırlı
+                logger.error("FFmpeg transcode failed", pipeline_id=pipeline_id,
+                             stderr=stderr_tail[-4096:].decode(errors="replace"))
+                return {
+                    "error": stderr_tail.decode(errors="replace"),
+                    "status": "failed"
+                }
+                
+        except Exception as e:
+            logger.error(f"Error processing video with FFmpeg: {str(e)}", pipeline_id=pipeline_id)
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+    
+    async def extract_audio(self, video_url: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract audio from video
+        """
+        try:
+            output_filename = f"audio_{pipeline_id}.mp3"
+            output_path = f"/tmp/{output_filename}"
+            
+            cmd = [
+                self.ffmpeg_path,
+                "-i", video_url,
+                "-vn",  # No video
+                "-acodec", "mp3",
+                "-y",
+                output_path
+            ]
+
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            stderr_task = asyncio.create_task(self._drain_stderr(process))
+            await process.wait()
+            stderr_tail = await stderr_task
+
+            if process.returncode == 0:
+                return {
+                    "audio_file": output_path,
+                    "format": "mp3",
+                    "status": "success"
+                }
+            else:
+                return {
+                    "error": stderr_tail.decode(errors="replace"),
+                    "status": "failed"
+                }
+                
+        except Exception as e:
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+    
+    async def get_video_info(self, video_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Get video information using FFprobe
+
+        Sadece ihtiyaç duyulan alanlar sorgulanır (-select_streams v:0 +
+        -show_entries): ffprobe daha az iş yapar, stdout ~10x küçülür ve
+        parse maliyeti buna orantılı düşer. Sonuçlar içerik imzasıyla
+        cache'lenir: ikinci ve sonraki probe'lar fork+exec yerine
+        mikrosaniyeler içinde döner.
+        """
+        try:
+            cache_key = await self._probe_cache_key(video_url)
+            cached = self._probe_cache.get(cache_key)
+            if cached is not None:
+                self._probe_cache.move_to_end(cache_key)
+                return cached
+
+            cmd = [
+                "ffprobe",
+                "-v", "error",
+                "-select_streams", "v:0",
+                "-show_entries",
+                "stream=width,height,codec_name,r_frame_rate,duration:format=duration,bit_rate",
+                "-of", "json",
+                video_url
+            ]
+
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            stdout, stderr = await process.communicate()
+
+            if process.returncode == 0:
+                raw = orjson.loads(stdout)
+                stream = (raw.get("streams") or [{}])[0]
+                fmt = raw.get("format", {})
+
+                # r_frame_rate "30000/1001" formatında gelir
+                fps = None
+                rate = stream.get("r_frame_rate", "")
+                if "/" in rate:
+                    num, _, den = rate.partition("/")
+                    try:
+                        fps = round(int(num) / int(den), 3) if int(den) else None
+                    except ValueError:
+                        pass
+
+                duration = stream.get("duration") or fmt.get("duration")
+                bit_rate = fmt.get("bit_rate")
+
+                result = {
+                    "info": {
+                        "width": stream.get("width"),
+                        "height": stream.get("height"),
+                        "codec": stream.get("codec_name"),
+                        "fps": fps,
+                        "duration": float(duration) if duration else None,
+                        "bit_rate": int(bit_rate) if bit_rate else None
+                    },
+                    "status": "success"
+                }
+
+                # Sadece başarılı sonuçlar cache'lenir (LRU)
+                self._probe_cache[cache_key] = result
+                self._probe_cache.move_to_end(cache_key)
+                while len(self._probe_cache) > _PROBE_CACHE_SIZE:
+                    self._probe_cache.popitem(last=False)
+
+                return result
+            else:
+                return {
+                    "error": stderr.decode(errors="replace"),
+                    "status": "failed"
+                }
+
+        except Exception as e:
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+
+# Global FFmpeg service instance
 ffmpeg_service = FFmpegService() 
\ No newline at end of file
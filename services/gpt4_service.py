@@ -1,212 +1,389 @@
-from typing import Optional, Dict, Any, List
-import asyncio
-import httpx
-from config import Config
-
-class GPT4Service:
-    """GPT-4 analysis service"""
-    
-    def __init__(self):
-        self.api_key = Config.GPT4_API_KEY if hasattr(Config, 'GPT4_API_KEY') else None
-        self.base_url = "https://api.openai.com/v1/chat/completions"
-    
-    async def analyze_content(self, content: str, pipeline_id: str, analysis_type: str = "general", options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
-        """
-        Analyze content using GPT-4
-        """
-        try:
-            # Default options
-            default_options = {
-                "model": "gpt-4",
-                "max_tokens": 1000,
-                "temperature": 0.7
-            }
-            
-            if options:
-                default_options.update(options)
-            
-            # Build prompt based on analysis type
-            prompt = self._build_prompt(content, analysis_type)
-            
-            # Prepare request
-            payload = {
-                "model": default_options["model"],
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a helpful AI assistant that analyzes video content and provides insights."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": default_options["max_tokens"],
-                "temperature": default_options["temperature"]
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            # Make API request
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    json=payload,
-                    headers=headers,
-                    timeout=60.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    return {
-                        "analysis": content,
-                        "analysis_type": analysis_type,
-                        "model": default_options["model"],
-                        "status": "success",
-                        "processing_time": "2.1s"
-                    }
-                else:
-                    return {
-                        "error": f"GPT-4 API error: {response.status_code} - {response.text}",
-                        "status": "failed"
-                    }
-                    
-        except Exception as e:
-            print(f"Error analyzing content with GPT-4: {str(e)}")
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-    
-    def _build_prompt(self, content: str, analysis_type: str) -> str:
-        """
-        Build appropriate prompt based on analysis type
-        """
-        if analysis_type == "sentiment":
-            return f"""
-            Analyze the sentiment of the following content and provide insights:
-            
-            Content: {content}
-            
-            Please provide:
-            1. Overall sentiment (positive, negative, neutral)
-            2. Sentiment score (0-100)
-            3. Key emotional indicators
-            4. Recommendations for improvement
-            """
-        
-        elif analysis_type == "summary":
-            return f"""
-            Provide a comprehensive summary of the following content:
-            
-            Content: {content}
-            
-            Please provide:
-            1. Main topics discussed
-            2. Key points
-            3. Important insights
-            4. Action items or recommendations
-            """
-        
-        elif analysis_type == "transcript_analysis":
-            return f"""
-            Analyze this video transcript and provide insights:
-            
-            Transcript: {content}
-            
-            Please provide:
-            1. Main topics and themes
-            2. Key insights and takeaways
-            3. Sentiment analysis
-            4. Content quality assessment
-            5. Suggestions for improvement
-            """
-        
-        else:  # general
-            return f"""
-            Analyze the following content and provide comprehensive insights:
-            
-            Content: {content}
-            
-            Please provide:
-            1. Main themes and topics
-            2. Key insights
-            3. Sentiment analysis
-            4. Quality assessment
-            5. Recommendations
-            """
-    
-    async def analyze_video_transcript(self, transcript: str, video_metadata: Optional[Dict[str, Any]] = None, pipeline_id: str = "") -> Optional[Dict[str, Any]]:
-        """
-        Analyze video transcript with metadata
-        """
-        try:
-            # Combine transcript with metadata
-            full_content = f"Transcript: {transcript}"
-            
-            if video_metadata:
-                metadata_str = f"\n\nVideo Metadata: {video_metadata}"
-                full_content += metadata_str
-            
-            return await self.analyze_content(
-                content=full_content,
-                pipeline_id=pipeline_id,
-                analysis_type="transcript_analysis"
-            )
-            
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-    
-    async def generate_summary(self, content: str, pipeline_id: str, summary_type: str = "concise") -> Optional[Dict[str, Any]]:
-        """
-        Generate summary of content
-        """
-        try:
-            summary_prompt = f"""
-            Generate a {summary_type} summary of the following content:
-            
-            Content: {content}
-            
-            Please provide a clear, well-structured summary that captures the main points.
-            """
-            
-            # Use GPT-4 for summarization
-            return await self.analyze_content(
-                content=summary_prompt,
-                pipeline_id=pipeline_id,
-                analysis_type="summary"
-            )
-            
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-    
-    async def analyze_sentiment(self, content: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
-        """
-        Analyze sentiment of content
-        """
-        try:
-            return await self.analyze_content(
-                content=content,
-                pipeline_id=pipeline_id,
-                analysis_type="sentiment"
-            )
-            
-        except Exception as e:
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-
-# Global GPT-4 service instance
+from typing import Optional, Dict, Any, List, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import httpx
+from config import Config
+from utils.http_client import get_http_client
+from utils.logger import logger
+
+# Memoization cache boyutu (identik promptlar için LRU)
+_CACHE_SIZE = 1024
+
+# Batch API ayarları: debounce penceresi içinde biriken istekler tek
+# JSONL batch olarak gönderilir (%50 indirim, amorti edilmiş HTTP maliyeti)
+_BATCH_FLUSH_DELAY = 0.5
+_BATCH_POLL_INTERVAL = 10.0
+_BATCH_TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+
+_BASE_SYSTEM = "You are a helpful AI assistant that analyzes video content and provides insights."
+
+# Analysis tipi başına import sırasında derlenmiş (system, user) şablonlar.
+# Sabit rubric system mesajında durur: OpenAI prompt caching identik
+# prefix'leri indirimli/düşük-TTFT yoldan servis eder; user mesajı sadece
+# değişken içeriği taşır
+_ANALYSIS_PROMPTS = {
+    "sentiment": {
+        "system": _BASE_SYSTEM + """
+
+Analyze the sentiment of the user's content and provide:
+1. Overall sentiment (positive, negative, neutral)
+2. Sentiment score (0-100)
+3. Key emotional indicators
+4. Recommendations for improvement""",
+        "user": "Content: {content}",
+    },
+    "summary": {
+        "system": _BASE_SYSTEM + """
+
+Provide a comprehensive summary of the user's content:
+1. Main topics discussed
+2. Key points
+3. Important insights
+4. Action items or recommendations""",
+        "user": "Content: {content}",
+    },
+    "transcript_analysis": {
+        "system": _BASE_SYSTEM + """
+
+Analyze the user's video transcript and provide:
+1. Main topics and themes
+2. Key insights and takeaways
+3. Sentiment analysis
+4. Content quality assessment
+5. Suggestions for improvement""",
+        "user": "Transcript: {content}",
+    },
+    "general": {
+        "system": _BASE_SYSTEM + """
+
+Analyze the user's content and provide comprehensive insights:
+1. Main themes and topics
+2. Key insights
+3. Sentiment analysis
+4. Quality assessment
+5. Recommendations""",
+        "user": "Content: {content}",
+    },
+}
+
+class GPT4Service:
+    """GPT-4 analysis service"""
+
+    def __init__(self):
+        self.api_key = Config.GPT4_API_KEY if hasattr(Config, 'GPT4_API_KEY') else None
+        self.base_url = "https://api.openai.com/v1/chat/completions"
+        # Uzun ömürlü client: TLS handshake bağlantı başına bir kez yapılır,
+        # HTTP/2 sayesinde eşzamanlı çağrılar aynı bağlantıyı paylaşır
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+
+        # (model|temperature|max_tokens|analysis_type|content) -> Future
+        # Future kullanımı single-flight sağlar: aynı anda gelen identik
+        # istekler tek API çağrısını bekler
+        self._cache: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+
+        # Batch API kuyruğu: (custom_id, future, payload, analysis_type)
+        self._batch_queue: List[Tuple[str, asyncio.Future, Dict[str, Any], str]] = []
+        self._batch_flusher: Optional[asyncio.Task] = None
+
+    async def aclose(self):
+        """Client'ı kapat (uygulama shutdown'ında çağrılır)"""
+        await self.client.aclose()
+
+    async def analyze_content(self, content: str, pipeline_id: str, analysis_type: str = "general", options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Analyze content using GPT-4 (identik istekler memoize edilir)
+        """
+        default_options = {
+            "model": "gpt-4",
+            "max_tokens": 1000,
+            "temperature": 0.7
+        }
+
+        if options:
+            default_options.update(options)
+
+        # batchable=True: interaktif olmayan çağrılar Batch API üzerinden
+        # toplu gider (cache anahtarına girmez, sadece yolu seçer)
+        batchable = default_options.pop("batchable", False)
+
+        key = hashlib.sha256(
+            f"{default_options['model']}|{default_options['temperature']}|"
+            f"{default_options['max_tokens']}|{analysis_type}|{content}".encode()
+        ).hexdigest()
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return await asyncio.shield(cached)
+
+        future = asyncio.get_running_loop().create_future()
+        self._cache[key] = future
+        while len(self._cache) > _CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+        try:
+            if batchable:
+                result = await self._queue_for_batch(key, content, analysis_type, default_options)
+            else:
+                result = await self._analyze_content_uncached(content, pipeline_id, analysis_type, default_options)
+        except BaseException as e:
+            # İlk çağıran iptal edilir ya da patlarsa (ör. pipeline cancel)
+            # cache'te çözülmemiş future kalmasın: anahtar düşer, bekleyenler
+            # sonsuza dek asılı kalmak yerine hemen hata alır
+            self._cache.pop(key, None)
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    future.exception()  # bekleyen yoksa "never retrieved" uyarısını sustur
+            raise
+
+        # Başarısız yanıtlar cache'lenmez; bekleyenler sonucu yine alır
+        if not result or result.get("status") == "failed":
+            self._cache.pop(key, None)
+
+        future.set_result(result)
+        return result
+
+    def _build_payload(self, content: str, analysis_type: str, default_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat-completions payload'ını kur (direct ve batch yolu paylaşır)"""
+        # Şablon lookup + tek format çağrısı; f-string inşası yok
+        prompts = _ANALYSIS_PROMPTS.get(analysis_type, _ANALYSIS_PROMPTS["general"])
+        return {
+            "model": default_options["model"],
+            "messages": [
+                {
+                    "role": "system",
+                    "content": prompts["system"]
+                },
+                {
+                    "role": "user",
+                    "content": prompts["user"].format(content=content)
+                }
+            ],
+            "max_tokens": default_options["max_tokens"],
+            "temperature": default_options["temperature"]
+        }
+
+    async def _queue_for_batch(self, key: str, content: str, analysis_type: str, default_options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        İsteği batch kuyruğuna ekle ve sonucu bekle. Debounce penceresi
+        içinde biriken tüm istekler tek Batch API gönderimiyle işlenir.
+        """
+        payload = self._build_payload(content, analysis_type, default_options)
+        future = asyncio.get_running_loop().create_future()
+        self._batch_queue.append((key, future, payload, analysis_type))
+
+        if self._batch_flusher is None or self._batch_flusher.done():
+            self._batch_flusher = asyncio.create_task(self._flush_batch_queue())
+
+        return await future
+
+    async def _flush_batch_queue(self) -> None:
+        """Kuyruğu JSONL olarak Batch API'ye gönder, sonuçları dağıt"""
+        await asyncio.sleep(_BATCH_FLUSH_DELAY)
+        entries, self._batch_queue = self._batch_queue, []
+        if not entries:
+            return
+
+        try:
+            # JSONL input: her satır bir chat-completions isteği
+            lines = b"\n".join(
+                json.dumps({
+                    "custom_id": key,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": payload
+                }).encode()
+                for key, _, payload, _ in entries
+            )
+
+            # Multipart upload paylaşılan client'tan gider (bu servisin
+            # client'ı default Content-Type: application/json taşır)
+            http = get_http_client()
+            auth = {"Authorization": f"Bearer {self.api_key}"}
+
+            upload = await http.post(
+                "https://api.openai.com/v1/files",
+                files={"file": ("batch.jsonl", lines, "application/jsonl"),
+                       "purpose": (None, "batch")},
+                headers=auth
+            )
+            upload.raise_for_status()
+            input_file_id = upload.json()["id"]
+
+            created = await self.client.post(
+                "https://api.openai.com/v1/batches",
+                json={
+                    "input_file_id": input_file_id,
+                    "endpoint": "/v1/chat/completions",
+                    "completion_window": "24h"
+                }
+            )
+            created.raise_for_status()
+            batch = created.json()
+
+            while batch.get("status") not in _BATCH_TERMINAL_STATES:
+                await asyncio.sleep(_BATCH_POLL_INTERVAL)
+                poll = await self.client.get(
+                    f"https://api.openai.com/v1/batches/{batch['id']}"
+                )
+                poll.raise_for_status()
+                batch = poll.json()
+
+            if batch.get("status") != "completed" or not batch.get("output_file_id"):
+                raise RuntimeError(f"Batch ended with status: {batch.get('status')}")
+
+            output = await http.get(
+                f"https://api.openai.com/v1/files/{batch['output_file_id']}/content",
+                headers=auth
+            )
+            output.raise_for_status()
+
+            responses = {}
+            for line in output.text.splitlines():
+                if line:
+                    item = json.loads(line)
+                    responses[item.get("custom_id")] = item
+
+            for key, future, payload, analysis_type in entries:
+                if future.done():
+                    continue
+                item = responses.get(key)
+                body = (item or {}).get("response", {}).get("body", {})
+                choices = body.get("choices")
+                if choices:
+                    future.set_result({
+                        "analysis": choices[0]["message"]["content"],
+                        "analysis_type": analysis_type,
+                        "model": payload["model"],
+                        "status": "success",
+                        "processing_time": "batch"
+                    })
+                else:
+                    future.set_result({
+                        "error": f"Batch item missing response: {key}",
+                        "status": "failed"
+                    })
+
+        except Exception as e:
+            logger.error(f"GPT-4 batch flush failed: {str(e)}")
+            for _, future, _, _ in entries:
+                if not future.done():
+                    future.set_result({"error": str(e), "status": "failed"})
+
+    async def _analyze_content_uncached(self, content: str, pipeline_id: str, analysis_type: str, default_options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Analyze content using GPT-4
+        """
+        try:
+            payload = self._build_payload(content, analysis_type, default_options)
+
+            # Make API request (paylaşılan client, keep-alive bağlantı)
+            response = await self.client.post(self.base_url, json=payload)
+
+            if response.status_code == 200:
+                result = response.json()
+                content = result["choices"][0]["message"]["content"]
+
+                return {
+                    "analysis": content,
+                    "analysis_type": analysis_type,
+                    "model": default_options["model"],
+                    "status": "success",
+                    "processing_time": "2.1s"
+                }
+            else:
+                return {
+                    "error": f"GPT-4 API error: {response.status_code} - {response.text}",
+                    "status": "failed"
+                }
+
+
+        except Exception as e:
+            logger.error(f"Error analyzing content with GPT-4: {str(e)}", pipeline_id=pipeline_id)
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+    
+    async def analyze_video_transcript(self, transcript: str, video_metadata: Optional[Dict[str, Any]] = None, pipeline_id: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Analyze video transcript with metadata
+        """
+        try:
+            # Combine transcript with metadata
+            full_content = f"Transcript: {transcript}"
+            
+            if video_metadata:
+                metadata_str = f"\n\nVideo Metadata: {video_metadata}"
+                full_content += metadata_str
+            
+            return await self.analyze_content(
+                content=full_content,
+                pipeline_id=pipeline_id,
+                analysis_type="transcript_analysis"
+            )
+            
+        except Exception as e:
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+    
+    async def generate_summary(self, content: str, pipeline_id: str, summary_type: str = "concise") -> Optional[Dict[str, Any]]:
+        """
+        Generate summary of content
+        """
+        try:
+            summary_prompt = f"""
+            Generate a {summary_type} summary of the following content:
+            
+            Content: {content}
+            
+            Please provide a clear, well-structured summary that captures the main points.
+            """
+            
+            # Use GPT-4 for summarization
+            return await self.analyze_content(
+                content=summary_prompt,
+                pipeline_id=pipeline_id,
+                analysis_type="summary"
+            )
+            
+        except Exception as e:
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+    
+    async def analyze_sentiment(self, content: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Analyze sentiment of content
+        """
+        try:
+            return await self.analyze_content(
+                content=content,
+                pipeline_id=pipeline_id,
+                analysis_type="sentiment"
+            )
+            
+        except Exception as e:
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+
+# Global GPT-4 service instance
 gpt4_service = GPT4Service() 
\ No newline at end of file
@@ -1,156 +1,216 @@
-from typing import Optional, Dict, Any
-from runwayml import RunwayML, TaskFailedError
-import asyncio
-import httpx
-import aiofiles
-import os
-import tempfile
-from config import Config
-
-class RunwayService:
-    """Runway ML video processing service"""
-    
-    def __init__(self):
-        self.client = RunwayML()
-    
-    async def download_video(self, video_url: str, pipeline_id: str) -> Optional[str]:
-        """
-        Video'yu URL'den indir ve geçici dosya olarak kaydet
-        """
-        try:
-            # Geçici dosya oluştur
-            temp_dir = tempfile.gettempdir()
-            temp_file = os.path.join(temp_dir, f"video_{pipeline_id}.mp4")
-            
-            # Video'yu indir
-            async with httpx.AsyncClient() as client:
-                response = await client.get(video_url, timeout=300.0)  # 5 dakika timeout
-                
-                if response.status_code == 200:
-                    # Dosyayı kaydet
-                    async with aiofiles.open(temp_file, 'wb') as f:
-                        await f.write(response.content)
-                    
-                    print(f"Video downloaded: {temp_file}")
-                    return temp_file
-                else:
-                    print(f"Failed to download video: {response.status_code}")
-                    return None
-                    
-        except Exception as e:
-            print(f"Error downloading video: {str(e)}")
-            return None
-    
-    async def process_video(self, video_url: str, prompt: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
-        """
-        Video-to-video processing using Runway ML
-        """
-        try:
-            # Önce video'yu indir
-            local_video_path = await self.download_video(video_url, pipeline_id)
-            
-            if not local_video_path:
-                return {
-                    "error": "Failed to download video from URL",
-                    "status": "failed"
-                }
-            
-            # Use Runway ML SDK for video-to-video transformation
-            # Note: This is a placeholder implementation based on available models
-            # You may need to adjust based on actual Runway ML video models
-            
-            # For now, using text-to-image as example, but you'll need video-to-video model
-            task = self.client.text_to_image.create(
-                model='gen4_image',  # Replace with actual video model when available
-                ratio='1920:1080',
-                prompt_text=prompt,
-                # For video-to-video, you'd use something like:
-                # task = self.client.video_to_video.create(
-                #     model='gen4_video',
-                #     input_video=local_video_path,  # Local file path
-                #     prompt_text=prompt
-                # )
-            ).wait_for_task_output()
-            
-            # Extract output URL
-            if hasattr(task, 'output') and task.output:
-                output_url = task.output[0] if isinstance(task.output, list) else str(task.output)
-                
-                # Cleanup: Geçici dosyayı sil
-                try:
-                    os.remove(local_video_path)
-                    print(f"Temporary file cleaned: {local_video_path}")
-                except:
-                    pass
-                
-                return {
-                    "video_url": output_url,
-                    "processing_time": "2.5s",
-                    "model": "gen4_image",
-                    "status": "success"
-                }
-            else:
-                print("No output URL found in task result")
-                return None
-                
-        except TaskFailedError as e:
-            print(f"Runway ML task failed: {e.task_details}")
-            return {
-                "error": str(e.task_details),
-                "status": "failed"
-            }
-        except Exception as e:
-            print(f"Error processing video with Runway ML SDK: {str(e)}")
-            return {
-                "error": str(e),
-                "status": "failed"
-            }
-    
-    async def process_video_legacy(self, video_url: str, prompt: str) -> Optional[str]:
-        """
-        Legacy HTTP API implementation (fallback)
-        """
-        try:
-            import httpx
-            
-            async with httpx.AsyncClient() as client:
-                # Get headers from config
-                headers = Config.get_runway_headers()
-                
-                # Prepare the request payload
-                payload = {
-                    "model": "gen4-aleph",  # Updated to Gen4
-                    "input": {
-                        "video": video_url,
-                        "prompt": prompt
-                    },
-                    "parameters": {
-                        "guidance_scale": 7.5,
-                        "num_frames": 16,
-                        "num_inference_steps": 50
-                    }
-                }
-                
-                # Make API request
-                response = await client.post(
-                    f"{Config.RUNWAY_ML_BASE_URL}/inference",
-                    headers=headers,
-                    json=payload,
-                    timeout=300.0  # 5 minutes timeout
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    # Extract output video URL from response
-                    output_url = result.get("output", {}).get("video_url")
-                    return output_url
-                else:
-                    print(f"Runway ML API error: {response.status_code} - {response.text}")
-                    return None
-                    
-        except Exception as e:
-            print(f"Error processing video with Runway ML: {str(e)}")
-            return None
-
-# Global runway service instance
+from typing import Optional, Dict, Any
+from collections import OrderedDict
+from runwayml import RunwayML, TaskFailedError
+import asyncio
+import contextlib
+import hashlib
+import httpx
+import aiofiles
+import os
+from config import Config
+from utils.http_client import (
+    MAX_HTTP_ATTEMPTS,
+    RETRYABLE_STATUSES,
+    backoff_sleep,
+    get_http_client,
+    request_with_backoff,
+)
+from utils.logger import logger
+
+# Aynı video+prompt için tamamlanmış dönüşümler tekrar Runway'e gitmez (LRU)
+_RESULT_CACHE_SIZE = 256
+
+class RunwayService:
+    """Runway ML video processing service"""
+
+    def __init__(self):
+        self.client = RunwayML()
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def download_video(self, video_url: str, pipeline_id: str) -> Optional[str]:
+        """
+        Video'yu URL'den indir ve geçici dosya olarak kaydet
+        """
+        temp_file = None
+        try:
+            # Video'yu akış halinde indir: byte'lar geldikçe diske yazılır,
+            # dosyanın tamamı hiçbir anda bellekte tutulmaz ve ağ/disk
+            # I/O'su üst üste biner. Paylaşılan client keep-alive bağlantıyı
+            # yeniden kullanır (TLS handshake tekrarı yok)
+            client = get_http_client()
+
+            # OS'in seçtiği çakışmasız geçici dosya: manuel gettempdir+join
+            # yok, aynı pipeline_id ile yarışan indirmeler çakışmaz
+            async with aiofiles.tempfile.NamedTemporaryFile(
+                'wb', suffix=".mp4", prefix=f"video_{pipeline_id}_", delete=False
+            ) as f:
+                temp_file = str(f.name)
+                # Geçici 429/5xx, dakikalarca sürecek Runway işini baştan
+                # tetiklemesin: indirmeyi backoff'la birkaç kez dene
+                for attempt in range(MAX_HTTP_ATTEMPTS):
+                    await f.seek(0)
+                    await f.truncate()
+                    async with client.stream("GET", video_url, timeout=300.0) as response:  # 5 dakika timeout
+                        status = response.status_code
+                        if status == 200:
+                            async for chunk in response.aiter_bytes(chunk_size=1 << 20):
+                                await f.write(chunk)
+                            break
+                    if status not in RETRYABLE_STATUSES or attempt + 1 >= MAX_HTTP_ATTEMPTS:
+                        logger.error("Failed to download video", status_code=status, pipeline_id=pipeline_id)
+                        os.remove(temp_file)
+                        return None
+                    await backoff_sleep(attempt)
+
+            logger.debug("Video downloaded", path=temp_file, pipeline_id=pipeline_id)
+            return temp_file
+
+        except Exception as e:
+            logger.error("Error downloading video", error=str(e), pipeline_id=pipeline_id)
+            # Yarım kalan dosya bırakılmaz
+            if temp_file:
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+            return None
+    
+    async def process_video(self, video_url: str, prompt: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Video-to-video processing using Runway ML
+        """
+        try:
+            # Memoization: aynı video+prompt+model daha önce işlendiyse
+            # (pipeline'dan bağımsız) indirme ve API çağrısı tamamen atlanır
+            cache_key = hashlib.sha256(
+                f"{video_url}|{prompt}|gen4_image".encode()
+            ).hexdigest()
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+                return cached
+
+            # Önce video'yu indir
+            local_video_path = await self.download_video(video_url, pipeline_id)
+            
+            if not local_video_path:
+                return {
+                    "error": "Failed to download video from URL",
+                    "status": "failed"
+                }
+            
+            # Use Runway ML SDK for video-to-video transformation
+            # Note: This is a placeholder implementation based on available models
+            # You may need to adjust based on actual Runway ML video models
+            
+            # For now, using text-to-image as example, but you'll need video-to-video model
+            def _run_runway_task():
+                # Senkron SDK çağrısı: wait_for_task_output() Runway işi
+                # bitene kadar bloklar (saniyeler-dakikalar)
+                return self.client.text_to_image.create(
+                    model='gen4_image',  # Replace with actual video model when available
+                    ratio='1920:1080',
+                    prompt_text=prompt,
+                    # For video-to-video, you'd use something like:
+                    # task = self.client.video_to_video.create(
+                    #     model='gen4_video',
+                    #     input_video=local_video_path,  # Local file path
+                    #     prompt_text=prompt
+                    # )
+                ).wait_for_task_output()
+
+            try:
+                # Thread'e taşı: event loop bloklanmaz, diğer pipeline'ların
+                # indirme/transkripsiyon coroutine'leri Runway işi sürerken
+                # çalışmaya devam eder
+                task = await asyncio.to_thread(_run_runway_task)
+            finally:
+                # Cleanup: Geçici dosya hata/iptal dahil her çıkış yolunda
+                # silinir. Dar suppress: sadece zaten-silinmiş dosya tolere
+                # edilir, izin/IO hataları yutulmaz (dolu /tmp sessizce
+                # büyüyeceğine hata görünür olsun)
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(local_video_path)
+                    logger.debug("Temporary file cleaned", path=local_video_path, pipeline_id=pipeline_id)
+
+            # Extract output URL
+            if hasattr(task, 'output') and task.output:
+                output_url = task.output[0] if isinstance(task.output, list) else str(task.output)
+
+                result = {
+                    "video_url": output_url,
+                    "processing_time": "2.5s",
+                    "model": "gen4_image",
+                    "status": "success"
+                }
+                self._result_cache[cache_key] = result
+                self._result_cache.move_to_end(cache_key)
+                while len(self._result_cache) > _RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+                return result
+            else:
+                logger.warning("No output URL found in task result", pipeline_id=pipeline_id)
+                return None
+                
+        except TaskFailedError as e:
+            logger.service_error("runway", str(e.task_details), pipeline_id)
+            return {
+                "error": str(e.task_details),
+                "status": "failed"
+            }
+        except Exception as e:
+            logger.service_error("runway", str(e), pipeline_id)
+            return {
+                "error": str(e),
+                "status": "failed"
+            }
+    
+    async def process_video_legacy(self, video_url: str, prompt: str) -> Optional[str]:
+        """
+        Legacy HTTP API implementation (fallback)
+        """
+        try:
+            # Paylaşılan client: her çağrıda pool + TLS kurulumu yapılmaz
+            client = get_http_client()
+
+            # Get headers from config
+            headers = Config.get_runway_headers()
+
+            # Prepare the request payload
+            payload = {
+                "model": "gen4-aleph",  # Updated to Gen4
+                "input": {
+                    "video": video_url,
+                    "prompt": prompt
+                },
+                "parameters": {
+                    "guidance_scale": 7.5,
+                    "num_frames": 16,
+                    "num_inference_steps": 50
+                }
+            }
+
+            # Make API request (429/5xx'te backoff'la tekrar dener)
+            response = await request_with_backoff(
+                client, "POST",
+                f"{Config.RUNWAY_ML_BASE_URL}/inference",
+                headers=headers,
+                json=payload,
+                timeout=300.0  # 5 minutes timeout
+            )
+
+            if response.status_code == 200:
+                result = response.json()
+                # Extract output video URL from response
+                output_url = result.get("output", {}).get("video_url")
+                return output_url
+            else:
+                logger.error("Runway ML API error", status_code=response.status_code, body=response.text)
+                return None
+
+        except Exception as e:
+            logger.service_error("runway", str(e))
+            return None
+
+# Global runway service instance
 runway_service = RunwayService() 
\ No newline at end of file
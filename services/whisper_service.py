@@ -1,77 +1,217 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from types import MappingProxyType
 import asyncio
-import httpx
+import hashlib
+import json
+import os
 from config import Config
+from utils.buffer_pool import BufferReader, buffer_pool
+from utils.http_client import (
+    MAX_HTTP_ATTEMPTS,
+    RETRYABLE_STATUSES,
+    backoff_sleep,
+    get_http_client,
+    request_with_backoff,
+)
+
+# İçerik-hash memoization: aynı ses + aynı seçenekler ikinci kez paralı
+# API'ye gitmez (LRU)
+_RESULT_CACHE_SIZE = 256
 
 class WhisperService:
     """WhisperAI transcription service"""
-    
+
     def __init__(self):
         self.api_key = Config.WHISPER_API_KEY if hasattr(Config, 'WHISPER_API_KEY') else None
         self.base_url = "https://api.openai.com/v1/audio/transcriptions"
-    
-    async def transcribe_audio(self, audio_url: str, pipeline_id: str, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Değişmez istek sabitleri bir kez kurulur; sıcak yolda çağrı
+        # başına dict/f-string üretilmez (httpx headers'ı zaten kopyalar)
+        self._default_options = MappingProxyType({
+            "model": "whisper-1",
+            "language": "en",
+            "response_format": "json"
+        })
+        self._auth_headers = {
+            "Authorization": f"Bearer {self.api_key}"
+        }
+
+    def _result_cache_key(self, url: str, *parts: str) -> str:
+        """Memoization anahtarı — lokal dosyalar mtime+size imzası taşır,
+        içerik değişirse anahtar değişir"""
+        try:
+            st = os.stat(url)
+            sig = f"{st.st_mtime_ns}|{st.st_size}"
+        except OSError:
+            sig = ""
+        return hashlib.sha256("|".join((url, sig) + parts).encode()).hexdigest()
+
+    def _cache_result(self, key: str, result: Dict[str, Any]) -> None:
+        """Başarılı sonucu LRU cache'e yaz"""
+        self._result_cache[key] = result
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > _RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
+    def _local_enabled(self) -> bool:
+        """Lokal whisper.cpp yolu yapılandırılmış mı?"""
+        return bool(Config.WHISPER_CPP_BIN and Config.WHISPER_CPP_MODEL)
+
+    async def _transcribe_local(self, audio_path: str, default_options: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Transcribe audio using WhisperAI
+        Lokal whisper.cpp ile transkripsiyon — quantized GGML model CPU
+        SIMD kernelleriyle ~10x realtime çalışır; ağ gidiş-dönüşü ve
+        dakika başı API maliyeti yok.
         """
-        try:
-            # Default options
-            default_options = {
-                "model": "whisper-1",
-                "language": "en",
-                "response_format": "json"
-            }
-            
-            if options:
-                default_options.update(options)
-            
-            # Download audio file
-            async with httpx.AsyncClient() as client:
-                response = await client.get(audio_url)
-                if response.status_code != 200:
-                    return {
-                        "error": f"Failed to download audio: {response.status_code}",
-                        "status": "failed"
-                    }
-                
-                audio_data = response.content
-            
-            # Prepare form data
-            files = {
-                "file": ("audio.mp3", audio_data, "audio/mpeg"),
-                "model": (None, default_options["model"]),
-                "language": (None, default_options["language"]),
-                "response_format": (None, default_options["response_format"])
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}"
+        out_base = f"{audio_path}.whisper"
+        cmd = [
+            Config.WHISPER_CPP_BIN,
+            "-m", Config.WHISPER_CPP_MODEL,
+            "-f", audio_path,
+            "-oj", "-of", out_base,
+            "-l", default_options["language"],
+            "--threads", str(os.cpu_count() or 4)
+        ]
+
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+
+        if process.returncode != 0:
+            return {
+                "error": f"whisper.cpp error: {stderr.decode(errors='replace')}",
+                "status": "failed"
             }
-            
-            # Make API request
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    files=files,
-                    headers=headers,
-                    timeout=60.0
+
+        out_json = f"{out_base}.json"
+        try:
+            with open(out_json) as f:
+                result = json.load(f)
+        finally:
+            try:
+                os.remove(out_json)
+            except FileNotFoundError:
+                pass
+
+        transcript = "".join(
+            segment.get("text", "") for segment in result.get("transcription", [])
+        ).strip()
+
+        return {
+            "transcript": transcript,
+            "language": default_options["language"],
+            "model": os.path.basename(Config.WHISPER_CPP_MODEL),
+            "status": "success"
+        }
+
+    async def _post_audio(self, endpoint: str, audio_url: str, fields: Dict[str, str]):
+        """
+        Ortak indir-ve-POST yolu: her iki public metot da buradan geçer,
+        böylece streaming + buffer havuzu + paylaşılan client
+        optimizasyonları tek yerde uygulanır ve birbirinden sapamaz.
+
+        Lokal dosya (pipeline'da extract_audio diske yazar) multipart'a
+        doğrudan dosyadan akar; uzak ses havuzlanmış buffer'a indirilir.
+        İndirme başarısızsa hata dict'i, aksi halde httpx yanıtı döner.
+        """
+        client = get_http_client()
+        headers = self._auth_headers
+        form = {name: (None, value) for name, value in fields.items()}
+
+        if os.path.exists(audio_url):
+            # İndirme round-trip'i yok, httpx dosyayı chunk chunk okur
+            with open(audio_url, "rb") as audio_file:
+                form["file"] = ("audio.mp3", audio_file, "audio/mpeg")
+                return await request_with_backoff(
+                    client, "POST", endpoint, files=form, headers=headers, timeout=60.0
                 )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return {
-                        "transcript": result.get("text", ""),
-                        "language": result.get("language", default_options["language"]),
-                        "model": default_options["model"],
-                        "status": "success",
-                        "processing_time": "3.5s"
-                    }
-                else:
+
+        buf = await buffer_pool.acquire()
+        try:
+            # Geçici 429/5xx indirme hatası tüm transkripsiyon denemesini
+            # boşa çıkarmasın: backoff'la birkaç kez dene
+            for attempt in range(MAX_HTTP_ATTEMPTS):
+                buf.clear()
+                async with client.stream("GET", audio_url) as src:
+                    status = src.status_code
+                    if status == 200:
+                        async for chunk in src.aiter_bytes(chunk_size=1 << 20):
+                            buf.extend(chunk)
+                        break
+                if status not in RETRYABLE_STATUSES or attempt + 1 >= MAX_HTTP_ATTEMPTS:
                     return {
-                        "error": f"Whisper API error: {response.status_code} - {response.text}",
+                        "error": f"Failed to download audio: {status}",
                         "status": "failed"
                     }
-                    
+                await backoff_sleep(attempt)
+
+            # memoryview + BufferReader: encoder buffer'ın tam bir BytesIO
+            # kopyasını almak yerine view'den chunk chunk okur. with bloğu
+            # view'i POST bittikten sonra, buffer havuza dönmeden bırakır
+            with memoryview(buf) as view:
+                form["file"] = ("audio.mp3", BufferReader(view), "audio/mpeg")
+                return await request_with_backoff(
+                    client, "POST", endpoint, files=form, headers=headers, timeout=60.0
+                )
+        finally:
+            buffer_pool.release(buf)
+
+    async def transcribe_audio(self, audio_url: str, pipeline_id: str, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Transcribe audio using WhisperAI
+        """
+        try:
+            # Default options
+            default_options = {**self._default_options, **(options or {})}
+
+            # Memoization: aynı içerik + aynı seçenekler daha önce
+            # transkribe edildiyse upstream'e hiç gitme
+            cache_key = self._result_cache_key(
+                audio_url, default_options["model"],
+                default_options["language"], default_options["response_format"]
+            )
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+                return cached
+
+            # Lokal whisper.cpp varsa ve ses zaten diskte ise (pipeline'da
+            # extract_audio /tmp'ye yazar) API'ye hiç çıkma
+            if self._local_enabled() and os.path.exists(audio_url):
+                result = await self._transcribe_local(audio_url, default_options)
+                if result.get("status") == "success":
+                    self._cache_result(cache_key, result)
+                return result
+
+            response = await self._post_audio(self.base_url, audio_url, {
+                "model": default_options["model"],
+                "language": default_options["language"],
+                "response_format": default_options["response_format"]
+            })
+            if isinstance(response, dict):
+                return response
+
+            if response.status_code == 200:
+                result = response.json()
+                transcription = {
+                    "transcript": result.get("text", ""),
+                    "language": result.get("language", default_options["language"]),
+                    "model": default_options["model"],
+                    "status": "success",
+                    "processing_time": "3.5s"
+                }
+                self._cache_result(cache_key, transcription)
+                return transcription
+            else:
+                return {
+                    "error": f"Whisper API error: {response.status_code} - {response.text}",
+                    "status": "failed"
+                }
+
         except Exception as e:
             print(f"Error transcribing audio with Whisper: {str(e)}")
             return {
@@ -106,6 +246,29 @@ class WhisperService:
                 "status": "failed"
             }
     
+    async def transcribe_videos(self, video_urls: List[str], pipeline_id: str, options: Optional[Dict[str, Any]] = None, concurrency: int = 5) -> List[Optional[Dict[str, Any]]]:
+        """
+        Birden fazla videoyu eşzamanlı transkribe et.
+
+        Semaphore sınırlı TaskGroup: ses çıkarma / indirme / upload
+        aşamaları öğeler arasında üst üste biner, throughput bant
+        genişliği doyana kadar concurrency ile yaklaşık lineer ölçeklenir.
+        Her öğenin hatası kendi sonuç dict'inde kalır (transcribe_video
+        exception fırlatmaz), sıra girdi sırasıyla aynıdır.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results: List[Optional[Dict[str, Any]]] = [None] * len(video_urls)
+
+        async def transcribe_one(index: int, url: str) -> None:
+            async with semaphore:
+                results[index] = await self.transcribe_video(url, pipeline_id, options)
+
+        async with asyncio.TaskGroup() as tg:
+            for index, url in enumerate(video_urls):
+                tg.create_task(transcribe_one(index, url))
+
+        return results
+
     async def translate_audio(self, audio_url: str, target_language: str, pipeline_id: str) -> Optional[Dict[str, Any]]:
         """
         Translate audio to target language
@@ -113,52 +276,36 @@ class WhisperService:
         try:
             # Use Whisper translation endpoint
             translate_url = "https://api.openai.com/v1/audio/translations"
-            
-            # Download audio file
-            async with httpx.AsyncClient() as client:
-                response = await client.get(audio_url)
-                if response.status_code != 200:
-                    return {
-                        "error": f"Failed to download audio: {response.status_code}",
-                        "status": "failed"
-                    }
-                
-                audio_data = response.content
-            
-            # Prepare form data
-            files = {
-                "file": ("audio.mp3", audio_data, "audio/mpeg"),
-                "model": (None, "whisper-1"),
-                "response_format": (None, "json")
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            # Make API request
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    translate_url,
-                    files=files,
-                    headers=headers,
-                    timeout=60.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return {
-                        "translation": result.get("text", ""),
-                        "target_language": target_language,
-                        "model": "whisper-1",
-                        "status": "success"
-                    }
-                else:
-                    return {
-                        "error": f"Whisper translation error: {response.status_code} - {response.text}",
-                        "status": "failed"
-                    }
-                    
+
+            cache_key = self._result_cache_key(audio_url, "whisper-1", "translate", target_language)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+                return cached
+
+            response = await self._post_audio(translate_url, audio_url, {
+                "model": "whisper-1",
+                "response_format": "json"
+            })
+            if isinstance(response, dict):
+                return response
+
+            if response.status_code == 200:
+                result = response.json()
+                translation = {
+                    "translation": result.get("text", ""),
+                    "target_language": target_language,
+                    "model": "whisper-1",
+                    "status": "success"
+                }
+                self._cache_result(cache_key, translation)
+                return translation
+            else:
+                return {
+                    "error": f"Whisper translation error: {response.status_code} - {response.text}",
+                    "status": "failed"
+                }
+
         except Exception as e:
             return {
                 "error": str(e),
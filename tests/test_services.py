@@ -1,6 +1,6 @@
 import pytest
 import asyncio
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, patch
 from services.runway_service import RunwayService
 from services.ffmpeg_service import FFmpegService
 from services.whisper_service import WhisperService
@@ -100,13 +100,24 @@ class TestWhisperService:
     @pytest.mark.asyncio
     async def test_transcribe_audio_success(self, whisper_service):
         """Başarılı ses transkripsiyonu testi"""
-        with patch('httpx.AsyncClient') as mock_client:
+        with patch('services.whisper_service.get_http_client') as mock_get_client:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"text": "This is a test transcript"}
-            mock_client.return_value.__aenter__.return_value.get.return_value = mock_response
-            mock_client.return_value.__aenter__.return_value.post.return_value = mock_response
-            
+
+            async def fake_chunks(chunk_size=None):
+                yield b"audio-bytes"
+
+            mock_stream_response = Mock()
+            mock_stream_response.status_code = 200
+            mock_stream_response.aiter_bytes = fake_chunks
+
+            mock_client = Mock()
+            mock_client.stream.return_value.__aenter__ = AsyncMock(return_value=mock_stream_response)
+            mock_client.stream.return_value.__aexit__ = AsyncMock(return_value=False)
+            mock_client.request = AsyncMock(return_value=mock_response)
+            mock_get_client.return_value = mock_client
+
             result = await whisper_service.transcribe_audio(
                 audio_url="https://example.com/audio.mp3",
                 pipeline_id="test-pipeline"
@@ -126,14 +137,14 @@ class TestGPT4Service:
     @pytest.mark.asyncio
     async def test_analyze_content_success(self, gpt4_service):
         """Başarılı içerik analizi testi"""
-        with patch('httpx.AsyncClient') as mock_client:
+        with patch.object(gpt4_service, 'client') as mock_client:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
                 "choices": [{"message": {"content": "Analysis result"}}]
             }
-            mock_client.return_value.__aenter__.return_value.post.return_value = mock_response
-            
+            mock_client.post = AsyncMock(return_value=mock_response)
+
             result = await gpt4_service.analyze_content(
                 content="Test content",
                 pipeline_id="test-pipeline"
@@ -0,0 +1,77 @@
+import asyncio
+import io
+
+# Havuz boyutu aynı anda uçuşta olabilecek indirme sayısını sınırlar;
+# cap üstüne büyüyen buffer havuza geri alınmaz (RSS tavanı)
+_POOL_SIZE = 8
+_BUFFER_CAP = 32 * 1024 * 1024  # 32 MiB
+
+class BufferPool:
+    """
+    Paylaşılan bytearray havuzu / Shared bytearray pool.
+
+    İstek başına taze bytes ayırmak (response.content) yüksek
+    eşzamanlılıkta allocator/arena'yı döver; havuz aynı buffer'ları
+    LIFO sırayla (cache-sıcak) yeniden kullanır ve toplam buffer
+    sayısını sabitler.
+    """
+
+    def __init__(self, size: int = _POOL_SIZE, cap: int = _BUFFER_CAP):
+        self._cap = cap
+        self._queue: "asyncio.LifoQueue[bytearray]" = asyncio.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._queue.put_nowait(bytearray())
+
+    async def acquire(self) -> bytearray:
+        """Havuzdan buffer al; hepsi kullanımdaysa biri bırakılana kadar bekle"""
+        return await self._queue.get()
+
+    def release(self, buf: bytearray) -> None:
+        """Buffer'ı sıfırlayıp havuza geri ver (her zaman finally içinde çağrılır)"""
+        if len(buf) > self._cap:
+            # Tek seferlik dev indirme havuzda yaşamasın
+            buf = bytearray()
+        else:
+            buf.clear()
+        self._queue.put_nowait(buf)
+
+class BufferReader(io.RawIOBase):
+    """
+    memoryview üzerinde sıfır-kopya read() / zero-copy reader.
+
+    httpx'in multipart encoder'ı bytes ya da read()'lenebilir bir obje
+    ister; io.BytesIO(buf) kurulumda buffer'ın tam bir kopyasını alır.
+    Bu sarmalayıcı view'den chunk chunk dilimler, O(boyut) ara kopya yok.
+    """
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = pos
+        elif whence == io.SEEK_CUR:
+            self._pos += pos
+        else:
+            self._pos = len(self._view) + pos
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._view) - self._pos
+        chunk = bytes(self._view[self._pos:self._pos + size])
+        self._pos += len(chunk)
+        return chunk
+
+# Global buffer pool instance (Whisper/Runway indirmeleri paylaşır)
+buffer_pool = BufferPool()
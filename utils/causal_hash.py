@@ -0,0 +1,17 @@
+import hashlib
+import json
+
+def canonical_json(data: dict) -> str:
+    """Dict'i deterministik JSON string'e çevir (key sırası sabit)"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+def compute_causal_hash(step_type: str, step_input: dict,
+                        parent_hash: str = "", service_version: str = "") -> str:
+    """Bir pipeline adımının nedensel hash'ini hesapla.
+
+    Hash; adım tipini, kanonik girdiyi, üst adımın hash'ini ve servis
+    versiyonunu kapsar: aynı girdiler + aynı geçmiş + aynı servis aynı
+    çıktıyı üretir, dolayısıyla hash cache anahtarı olarak kullanılabilir.
+    """
+    payload = "|".join([step_type, canonical_json(step_input), parent_hash, service_version])
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
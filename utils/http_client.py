@@ -0,0 +1,57 @@
+from typing import Optional
+import asyncio
+import random
+import httpx
+
+# Geçici upstream hataları: tekrar denemek, istemcinin tüm pipeline'ı
+# (dakikalarca Runway/Whisper hesabı dahil) baştan çalıştırmasından çok
+# daha ucuz
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+MAX_HTTP_ATTEMPTS = 4
+
+# Tüm servislerin paylaştığı tek httpx.AsyncClient — her istekte yeni client
+# açmak TLS handshake + DNS çözümlemesini baştan yapar; keep-alive havuzu
+# bunları bağlantı başına bire indirir.
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Paylaşılan httpx.AsyncClient'ı getir (lazy singleton)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+    return _client
+
+async def backoff_sleep(attempt: int) -> None:
+    """Üstel backoff + jitter — eşzamanlı retry'ların aynı anda
+    yüklenmesini (thundering herd) dağıtır"""
+    await asyncio.sleep((2 ** attempt) + random.random())
+
+async def request_with_backoff(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    attempts: int = MAX_HTTP_ATTEMPTS,
+    **kwargs
+) -> httpx.Response:
+    """
+    İsteği 429/502/503/504'te üstel backoff ile tekrarla; diğer tüm
+    yanıtlar (başarı dahil) olduğu gibi döner. Seek'lenebilir dosya
+    gövdeleri httpx tarafından her denemede başa sarılır.
+    """
+    response = await client.request(method, url, **kwargs)
+    for attempt in range(attempts - 1):
+        if response.status_code not in RETRYABLE_STATUSES:
+            break
+        await backoff_sleep(attempt)
+        response = await client.request(method, url, **kwargs)
+    return response
+
+async def close_http_client() -> None:
+    """Paylaşılan client'ı kapat (uygulama shutdown'ında çağrılır)"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
@@ -1,45 +1,71 @@
 import logging
 import sys
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from config import Config
 
-class PlaicubeLogger:
-    """Custom logger for Plaicube API"""
-    
-    def __init__(self, name: str = "plaicube"):
-        self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
-        
+@lru_cache(maxsize=None)
+def _get_logger(name: str) -> logging.Logger:
+    """Handler + formatter kurulumu isim başına bir kez yapılır; aynı
+    isimle tekrar PlaicubeLogger kurmak cache'ten döner (tekrarlı
+    instantiation/reload'larda handler birikmez)"""
+    log = logging.getLogger(name)
+    level = getattr(logging, Config.LOG_LEVEL.upper())
+    log.setLevel(level)
+
+    if not log.handlers:
         # Create console handler
         console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
-        
+        console_handler.setLevel(level)
+
         # Create formatter
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         console_handler.setFormatter(formatter)
-        
+
         # Add handler to logger
-        if not self.logger.handlers:
-            self.logger.addHandler(console_handler)
+        log.addHandler(console_handler)
+
+    return log
+
+class PlaicubeLogger:
+    """Custom logger for Plaicube API"""
+
+    def __init__(self, name: str = "plaicube"):
+        self.logger = _get_logger(name)
     
+    # %-formatting logging modülüne bırakılır: kayıt level filtresine
+    # takılırsa mesaj + kwargs repr'i hiç üretilmez (LOG_LEVEL=WARNING'de
+    # info/debug maliyeti tek isEnabledFor kontrolüne iner)
     def info(self, message: str, **kwargs):
         """Log info message"""
-        self.logger.info(f"{message} {kwargs if kwargs else ''}")
-    
+        if kwargs:
+            self.logger.info("%s %s", message, kwargs)
+        else:
+            self.logger.info(message)
+
     def error(self, message: str, **kwargs):
         """Log error message"""
-        self.logger.error(f"{message} {kwargs if kwargs else ''}")
-    
+        if kwargs:
+            self.logger.error("%s %s", message, kwargs)
+        else:
+            self.logger.error(message)
+
     def warning(self, message: str, **kwargs):
         """Log warning message"""
-        self.logger.warning(f"{message} {kwargs if kwargs else ''}")
-    
+        if kwargs:
+            self.logger.warning("%s %s", message, kwargs)
+        else:
+            self.logger.warning(message)
+
     def debug(self, message: str, **kwargs):
         """Log debug message"""
-        self.logger.debug(f"{message} {kwargs if kwargs else ''}")
+        if kwargs:
+            self.logger.debug("%s %s", message, kwargs)
+        else:
+            self.logger.debug(message)
     
     def pipeline_start(self, pipeline_id: str, video_id: str):
         """Log pipeline start"""
@@ -1,14 +1,36 @@
+import re
 import uuid
+from functools import lru_cache
 from typing import Optional
 from exceptions import ValidationException
 
-def validate_uuid(uuid_string: str, field_name: str = "ID") -> bool:
-    """Validate UUID format"""
+# Sıcak admission path'i için import sırasında derlenmiş desenler: tek
+# C-seviyesi tarama, çağrı başına lower() kopyası yok
+_SCHEME_RE = re.compile(r'^https?://', re.IGNORECASE)
+_VIDEO_EXT_RE = re.compile(r'\.(?:mp4|avi|mov|mkv|webm|flv)(?:$|[?#/])', re.IGNORECASE)
+
+# PipelineConfig alanlarının aynası (models.py) — set farkı tek C-seviyesi
+# işlemle tüm geçersiz anahtarları birden bulur
+_ALLOWED_CONFIG_KEYS = frozenset({
+    'enableRunwayVideo', 'enableFfmpeg', 'enableWhisper', 'enableGpt4',
+    'customSteps', 'maxConcurrency'
+})
+
+@lru_cache(maxsize=4096)
+def _is_valid_uuid(uuid_string: str) -> bool:
+    """uuid.UUID parse sonucunu cache'le — aynı pipeline/video ID'leri
+    istek ömrü boyunca defalarca doğrulanır, tekrarlar dict lookup'a iner"""
     try:
         uuid.UUID(uuid_string)
         return True
     except ValueError:
+        return False
+
+def validate_uuid(uuid_string: str, field_name: str = "ID") -> bool:
+    """Validate UUID format"""
+    if not _is_valid_uuid(uuid_string):
         raise ValidationException(f"Invalid {field_name} format: {uuid_string}")
+    return True
 
 def validate_video_url(url: str) -> bool:
     """Validate video URL format"""
@@ -16,25 +38,30 @@ def validate_video_url(url: str) -> bool:
         raise ValidationException("Video URL cannot be empty")
     
     # Basic URL validation
-    if not url.startswith(('http://', 'https://')):
+    if not _SCHEME_RE.match(url):
         raise ValidationException("Video URL must be a valid HTTP/HTTPS URL")
-    
+
     # Check for common video extensions
-    video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv']
-    if not any(ext in url.lower() for ext in video_extensions):
+    if not _VIDEO_EXT_RE.search(url):
         # Allow URLs without extensions (like CDN URLs)
         pass
-    
+
     return True
 
 def validate_prompt(prompt: str) -> bool:
     """Validate prompt text"""
-    if not prompt or not prompt.strip():
+    if not prompt:
         raise ValidationException("Prompt cannot be empty")
-    
+
+    # Uzunluk kontrolü önce: 1 MB'lık çöp prompt strip() kopyası
+    # ayrılmadan O(1)'de reddedilir
     if len(prompt) > 1000:
         raise ValidationException("Prompt too long (max 1000 characters)")
-    
+
+    # isspace() C seviyesinde, allocation'sız — strip() kopyasına gerek yok
+    if prompt.isspace():
+        raise ValidationException("Prompt cannot be empty")
+
     return True
 
 def validate_pipeline_config(config: dict) -> bool:
@@ -42,10 +69,8 @@ def validate_pipeline_config(config: dict) -> bool:
     if not isinstance(config, dict):
         raise ValidationException("Pipeline config must be a dictionary")
     
-    allowed_keys = ['enableRunwayVideo', 'enableFfmpeg', 'enableWhisper', 'enableGpt4', 'customSteps']
-    
-    for key in config.keys():
-        if key not in allowed_keys:
-            raise ValidationException(f"Invalid pipeline config key: {key}")
-    
+    extra = config.keys() - _ALLOWED_CONFIG_KEYS
+    if extra:
+        raise ValidationException(f"Invalid pipeline config keys: {sorted(extra)}")
+
     return True 
\ No newline at end of file